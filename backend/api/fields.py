@@ -0,0 +1,122 @@
+import base64
+import binascii
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (InMemoryUploadedFile,
+                                            TemporaryUploadedFile)
+from rest_framework import serializers
+
+from recipes.images import thumbnails_data, thumbnails_field
+
+DATA_URI_RE = re.compile(r'data:(?P<content_type>image/[\w.+-]+);base64,')
+IMAGE_SIGNATURES = {
+    'image/png': (b'\x89PNG\r\n\x1a\n', ),
+    'image/jpeg': (b'\xff\xd8\xff', ),
+    'image/jpg': (b'\xff\xd8\xff', ),
+    'image/gif': (b'GIF87a', b'GIF89a'),
+    'image/webp': (b'RIFF', ),
+}
+# Количество символов base64, декодируемых за раз, кратно 4
+DECODE_CHUNK_SIZE = 64 * 1024
+
+
+class Base64ImageField(serializers.ImageField):
+    """Изображение в виде data URI.
+
+    Данные декодируются частями сразу в загружаемый файл: небольшие
+    изображения остаются в памяти, крупные (больше
+    FILE_UPLOAD_MAX_MEMORY_SIZE) пишутся во временный файл на диске.
+    Размер и тип изображения проверяются до декодирования.
+    """
+
+    default_error_messages = {
+        'invalid_base64': 'Invalid base64 image data.',
+        'unsupported_type': 'Unsupported image type: {content_type}.',
+        'signature_mismatch': 'Image data does not match {content_type}.',
+        'too_large': 'Image is larger than {max_size} bytes.',
+    }
+
+    def __init__(self, file_name='image', max_size=None, **kwargs):
+        self.file_name = file_name
+        self.max_size = max_size
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data.startswith('data:image'):
+            data = self.decode(data)
+        return super().to_internal_value(data)
+
+    def decoded_size(self, data, start):
+        length = len(data) - start
+        if length % 4:
+            self.fail('invalid_base64')
+        return length // 4 * 3 - data.count('=', max(start, len(data) - 2))
+
+    def check_signature(self, head, content_type):
+        valid = head.startswith(IMAGE_SIGNATURES[content_type])
+        if content_type == 'image/webp':
+            valid = valid and head[8:12] == b'WEBP'
+        if not valid:
+            self.fail('signature_mismatch', content_type=content_type)
+
+    def decode_into(self, upload, data, start, content_type):
+        for position in range(start, len(data), DECODE_CHUNK_SIZE):
+            try:
+                chunk = base64.b64decode(
+                    data[position:position + DECODE_CHUNK_SIZE],
+                    validate=True
+                )
+            except binascii.Error:
+                self.fail('invalid_base64')
+            if position == start:
+                self.check_signature(chunk, content_type)
+            upload.write(chunk)
+
+    def decode(self, data):
+        header = DATA_URI_RE.match(data)
+        if header is None:
+            self.fail('invalid_base64')
+        content_type = header['content_type']
+        if content_type not in IMAGE_SIGNATURES:
+            self.fail('unsupported_type', content_type=content_type)
+
+        start = header.end()
+        size = self.decoded_size(data, start)
+        max_size = self.max_size or settings.IMAGE_UPLOAD_MAX_SIZE
+        if size > max_size:
+            self.fail('too_large', max_size=max_size)
+
+        name = f'{self.file_name}.{content_type.split("/")[-1]}'
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = TemporaryUploadedFile(name, content_type, size, None)
+        else:
+            upload = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, size, None
+            )
+        try:
+            self.decode_into(upload, data, start, content_type)
+        except serializers.ValidationError:
+            upload.close()
+            raise
+        upload.seek(0)
+        return upload
+
+
+class ThumbnailsField(serializers.Field):
+    """Миниатюры изображения и blurhash-заглушка, null пока
+    миниатюры строятся.
+    """
+
+    def __init__(self, image_field, **kwargs):
+        self.image_field = image_field
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, instance):
+        return thumbnails_data(
+            getattr(instance, thumbnails_field(self.image_field)),
+            getattr(instance, self.image_field)
+        )
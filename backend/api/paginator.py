@@ -1,9 +1,322 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import binascii
+import hashlib
+import heapq
+import json
+from functools import partial, reduce
+from itertools import groupby, islice
+from operator import or_
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.core.paginator import Paginator as DjangoPaginator
+from django.db import connection
+from django.db.models import Q
+from django.utils.functional import cached_property
+from rest_framework.exceptions import NotFound, ParseError
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.cache import LIST_VERSION_KEY, USER_VERSION_KEY, get_version
+from recipes.models import FeedEntry
+
+ESTIMATED_COUNT_MIN = 10_000
+INTEGER_FIELDS = (
+    'IntegerField', 'BigIntegerField', 'SmallIntegerField',
+    'PositiveIntegerField', 'PositiveBigIntegerField',
+    'PositiveSmallIntegerField',
+)
+
+
+class KeysetPagination(BasePagination):
+    """Пагинация по ключу без OFFSET и COUNT(*).
+
+    Курсор хранит значения полей ordering последнего объекта страницы,
+    следующая страница выбирается условием на эти поля, поэтому время
+    ответа не зависит от глубины страницы.
+    """
+
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'limit'
+    page_size = api_settings.PAGE_SIZE
+    ordering = ('-id', )
+    annotations = ()
+    invalid_cursor_message = 'Invalid cursor'
+    unsupported_ordering_message = (
+        'Cursor pagination is not supported for this ordering'
+    )
+
+    def __init__(self, ordering=None):
+        if ordering is not None:
+            self.ordering = ordering
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return page_size if page_size > 0 else self.page_size
+
+    def key_field(self, queryset, name):
+        """Поле модели или целочисленная аннотация для ключа курсора.
+
+        Вычисляемые ранги (поиск, покрытие набором) — числа с плавающей
+        точкой: сохранённое в курсоре значение не совпадёт с вычисленным
+        в базе, поэтому по ним курсор не строится.
+        """
+        annotation = queryset.query.annotations.get(name)
+        if annotation is not None:
+            field = annotation.output_field
+            if field.get_internal_type() in INTEGER_FIELDS:
+                return field
+            return None
+        try:
+            field = queryset.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            return None
+        return field if field.concrete else None
+
+    def get_ordering(self, queryset):
+        """Порядок страниц: заданный в запросе, например параметром
+        ordering, или порядок пагинатора по умолчанию.
+        """
+        if not queryset.query.order_by:
+            return self.ordering
+        pk_name = queryset.model._meta.pk.name
+        ordering = []
+        for key in queryset.query.order_by:
+            if not isinstance(key, str):
+                raise ParseError(self.unsupported_ordering_message)
+            descending = key.startswith('-')
+            name = key.lstrip('-')
+            name = pk_name if name == 'pk' else name
+            if self.key_field(queryset, name) is None:
+                raise ParseError(self.unsupported_ordering_message)
+            ordering.append(f'-{name}' if descending else name)
+        # Первичный ключ делает порядок однозначным
+        if not any(key.lstrip('-') == pk_name for key in ordering):
+            ordering.append(f'-{pk_name}')
+        return tuple(ordering)
+
+    def decode_cursor(self, request, queryset):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            values = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            if len(values) != len(self.ordering):
+                raise ValueError
+            return [
+                self.key_field(queryset, key.lstrip('-')).to_python(value)
+                for key, value in zip(self.ordering, values)
+            ]
+        except (binascii.Error, ValueError, TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, obj):
+        values = [
+            getattr(obj, name) if name in self.annotations
+            else obj._meta.get_field(name).value_to_string(obj)
+            for name in (key.lstrip('-') for key in self.ordering)
+        ]
+        return base64.urlsafe_b64encode(json.dumps(values).encode()).decode()
+
+    def keyset_filter(self, values):
+        """Условие «строго после» для лексикографического порядка полей."""
+        conditions = []
+        for position, field in enumerate(self.ordering):
+            name = field.lstrip('-')
+            lookup = 'lt' if field.startswith('-') else 'gt'
+            equal = {
+                previous.lstrip('-'): value
+                for previous, value in zip(
+                    self.ordering[:position], values[:position]
+                )
+            }
+            conditions.append(
+                Q(**equal, **{f'{name}__{lookup}': values[position]})
+            )
+        return reduce(or_, conditions)
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.ordering = self.get_ordering(queryset)
+        self.annotations = set(queryset.query.annotations)
+        queryset = queryset.order_by(*self.ordering)
+
+        values = self.decode_cursor(request, queryset)
+        if values is not None:
+            queryset = queryset.filter(self.keyset_filter(values))
+
+        page = list(queryset[:self.page_size + 1])
+        self.has_next = len(page) > self.page_size
+        self.page = page[:self.page_size]
+        return self.page
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.page[-1])
+        )
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'results': data
+        })
+
+
+class FeedPaginator(KeysetPagination):
+    """Пагинация ленты подписок по ключу (created_at, id).
+
+    Страница собирается слиянием уже отсортированных источников ленты:
+    разосланных записей FeedEntry и рецептов популярных авторов.
+    Из каждого источника читается не больше одной страницы.
+    """
+
+    ordering = ('-created_at', '-id')
+
+    def source_keys(self, source, ordering, values):
+        source = source.order_by(*ordering)
+        if values is not None:
+            source = source.filter(
+                KeysetPagination(ordering=ordering).keyset_filter(values)
+            )
+        return source[:self.page_size + 1]
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        values = self.decode_cursor(request, queryset)
+
+        merged = heapq.merge(
+            *(
+                self.source_keys(source, ordering, values)
+                for source, ordering in FeedEntry.objects.sources(
+                    request.user
+                )
+            ),
+            reverse=True
+        )
+        # Один рецепт может прийти из обоих источников
+        keys = list(islice(
+            (key for key, _ in groupby(merged)), self.page_size + 1
+        ))
+        ids = [pk for _, pk in keys[:self.page_size]]
+        recipes = queryset.in_bulk(ids)
+        self.page = [recipes[pk] for pk in ids if pk in recipes]
+        self.has_next = len(keys) > self.page_size and bool(self.page)
+        return self.page
 
 
 class FoodgramUserPaginator(PageNumberPagination):
+    """Постраничная пагинация, которая переключается на пагинацию
+    по ключу, если в запросе передан параметр cursor.
+    """
+
     page_size_query_param = 'limit'
+    keyset_ordering = ('id', )
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if KeysetPagination.cursor_query_param in request.query_params:
+            self.keyset = KeysetPagination(ordering=self.keyset_ordering)
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class CachedCountPaginator(DjangoPaginator):
+    """Paginator, который берёт общее количество объектов из кеша
+    или из статистики планировщика PostgreSQL.
+    """
+
+    def __init__(self, *args, cache_key=None, estimate=False, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_key = cache_key
+        self.estimate = estimate
+        self.count_is_exact = True
+
+    def estimated_count(self):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                'SELECT reltuples::bigint FROM pg_class '
+                'WHERE oid = %s::regclass',
+                [self.object_list.model._meta.db_table]
+            )
+            row = cursor.fetchone()
+        return row[0] if row else None
+
+    @cached_property
+    def count(self):
+        if self.estimate:
+            estimated = self.estimated_count()
+            # На маленьких или непроанализированных таблицах
+            # оценка неточна, а точный подсчёт и так дешёвый.
+            if estimated is not None and estimated >= ESTIMATED_COUNT_MIN:
+                self.count_is_exact = False
+                return estimated
+        if self.cache_key is None:
+            return self.object_list.count()
+        return cache.get_or_set(
+            self.cache_key,
+            self.object_list.count,
+            settings.RECIPE_COUNT_CACHE_TIMEOUT
+        )
 
 
 class RecipePaginator(FoodgramUserPaginator):
-    pass
+    keyset_ordering = ('-created_at', '-id')
+    user_filters = ('is_favorited', 'is_in_shopping_cart')
+
+    def get_count_options(self, request):
+        params = sorted(
+            (key, value)
+            for key, values in request.query_params.lists()
+            for value in values
+            if key not in (self.page_query_param, self.page_size_query_param)
+        )
+        estimate = (
+            not params
+            and settings.RECIPE_ESTIMATED_COUNT
+            and connection.vendor == 'postgresql'
+        )
+        # Количество избранного и корзины у каждого пользователя своё
+        if any(key in self.user_filters for key, _ in params):
+            params.append(('user', request.user.id))
+            params.append((
+                'user_version',
+                get_version(USER_VERSION_KEY.format(pk=request.user.id))
+            ))
+        signature = hashlib.md5(urlencode(params).encode()).hexdigest()
+        cache_key = 'recipes:count:{version}:{signature}'.format(
+            version=get_version(LIST_VERSION_KEY),
+            signature=signature
+        )
+        return {'cache_key': cache_key, 'estimate': estimate}
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.django_paginator_class = partial(
+            CachedCountPaginator, **self.get_count_options(request)
+        )
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        response = super().get_paginated_response(data)
+        if self.keyset is None:
+            response.data['count_is_exact'] = (
+                self.page.paginator.count_is_exact
+            )
+        return response
@@ -0,0 +1,16 @@
+"""Бенчмарки горячих путей API.
+
+Запускаются из каталога backend, каждый — отдельным модулем:
+
+    python -m benchmarks.ingredient_filters --recipes 100000
+
+Бенчмарк создаёт тестовую базу, как manage.py test, заполняет её
+и удаляет после замеров. Без PostgreSQL можно запускать
+с DB_ENGINE=sqlite, тогда замеряются только запасные пути.
+"""
+import os
+
+import django
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foodgram.settings')
+django.setup()
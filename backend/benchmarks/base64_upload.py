@@ -0,0 +1,73 @@
+"""Декодирование изображения из data URI: по частям в загружаемый файл
+против декодирования строки целиком. Кроме времени печатает пик
+выделенной памяти (tracemalloc) без учёта самой строки запроса.
+"""
+import argparse
+import base64
+import os
+import tracemalloc
+
+from django.core.files.base import ContentFile
+
+from api.fields import Base64ImageField
+
+from .common import measure, report
+
+PNG_SIGNATURE = b'\x89PNG\r\n\x1a\n'
+MEBIBYTE = 1024 * 1024
+
+
+def data_uri(size):
+    image = PNG_SIGNATURE + os.urandom(size - len(PNG_SIGNATURE))
+    return 'data:image/png;base64,' + base64.b64encode(image).decode()
+
+
+def naive_decode(data):
+    """Декодирование до появления Base64ImageField."""
+    format, imgstr = data.split(';base64,')
+    ext = format.split('/')[-1]
+    return ContentFile(base64.b64decode(imgstr), name='recipe.' + ext)
+
+
+def chunked_decode(data):
+    return Base64ImageField(file_name='recipe').decode(data)
+
+
+def peak_memory(func, data):
+    tracemalloc.start()
+    try:
+        upload = func(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    upload.close()
+    return peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sizes', type=float, nargs='+', default=[0.5, 2, 6],
+        help='размеры изображений в МиБ'
+    )
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    rows = []
+    for size in args.sizes:
+        data = data_uri(int(size * MEBIBYTE))
+        for name, func in (
+            ('целиком', naive_decode),
+            ('по частям', chunked_decode),
+        ):
+            peak = peak_memory(func, data) / MEBIBYTE
+            rows.append((
+                f'{name}, {size:g} МиБ, пик {peak:.1f} МиБ',
+                measure(lambda: func(data).close(), args.repeat),
+                None
+            ))
+    report('Декодирование изображений из base64', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""Пакетное добавление в избранное, корзину и подписки против
+отдельного запроса на каждый объект: время и число обращений к базе.
+"""
+import argparse
+
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+WARMUP = 2
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--size', type=int, default=50)
+    parser.add_argument('--recipes', type=int, default=10_000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with bench_database():
+        authors = create_users(args.size, 'author')
+        create_recipes(args.recipes, authors, create_ingredients(200))
+        recipe_ids = list(
+            Recipe.objects.values_list('pk', flat=True)[:args.size]
+        )
+        author_ids = [author.pk for author in authors]
+        # Каждый замер выполняет новый пользователь, чтобы все объекты
+        # действительно добавлялись
+        runs = args.repeat + WARMUP + 1
+        readers = iter(create_users(runs * 6, 'reader'))
+
+        def client():
+            api_client = APIClient()
+            api_client.force_authenticate(next(readers))
+            return api_client
+
+        def batch(url, ids):
+            return lambda: client().post(url, {'ids': ids}, format='json')
+
+        def one_by_one(url, ids):
+            def run():
+                api_client = client()
+                for pk in ids:
+                    api_client.post(url.format(pk=pk))
+            return run
+
+        cases = (
+            ('избранное', '/api/recipes/favorite/',
+             '/api/recipes/{pk}/favorite/', recipe_ids),
+            ('корзина', '/api/recipes/shopping_cart/',
+             '/api/recipes/{pk}/shopping_cart/', recipe_ids),
+            ('подписки', '/api/users/subscriptions/',
+             '/api/users/{pk}/subscribe/', author_ids),
+        )
+        rows = []
+        for name, batch_url, single_url, ids in cases:
+            for title, func in (
+                (f'{name}: пакет', batch(batch_url, ids)),
+                (f'{name}: по одному', one_by_one(single_url, ids)),
+            ):
+                rows.append((
+                    title,
+                    measure(func, args.repeat, WARMUP),
+                    count_queries(func)
+                ))
+        report(f'Пакетные операции, {args.size} объектов', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,150 @@
+import random
+import statistics
+import time
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.db import connection, reset_queries
+from django.test.utils import (CaptureQueriesContext, setup_databases,
+                               setup_test_environment, teardown_databases,
+                               teardown_test_environment)
+from django.utils import timezone
+
+from recipes.ingredient_sets import update_ingredient_ids
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+from recipes.search import is_postgresql, update_search_vectors
+
+BATCH_SIZE = 5000
+WORDS = (
+    'пирог', 'суп', 'салат', 'каша', 'запеканка', 'рагу', 'омлет',
+    'блины', 'котлеты', 'паста', 'плов', 'борщ', 'сырники', 'кекс'
+)
+
+
+@contextmanager
+def bench_database():
+    """Отдельная тестовая база на время бенчмарка.
+
+    Окружение то же, что у manage.py test, поэтому бенчмарки
+    могут обращаться к API через тестовый клиент.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity=0, interactive=False)
+    try:
+        yield
+    finally:
+        teardown_databases(old_config, verbosity=0)
+        teardown_test_environment()
+
+
+def measure(func, repeat=20, warmup=2):
+    """Медиана и 95-й перцентиль времени вызова func в миллисекундах."""
+    for _ in range(warmup):
+        func()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    timings.sort()
+    return {
+        'median': statistics.median(timings),
+        'p95': timings[min(len(timings) - 1, int(len(timings) * 0.95))],
+    }
+
+
+def count_queries(func):
+    # Журнал запросов ограничен, заполненный журнал дал бы 0
+    reset_queries()
+    with CaptureQueriesContext(connection) as context:
+        func()
+    return len(context)
+
+
+def report(title, rows):
+    """Печатает строки (название, результат measure, число запросов)."""
+    print(f'\n{title} [{connection.vendor}]')
+    for name, timing, queries in rows:
+        line = (
+            f'  {name:<42} median {timing["median"]:9.2f} ms'
+            f'   p95 {timing["p95"]:9.2f} ms'
+        )
+        if queries is not None:
+            line += f'   queries {queries}'
+        print(line)
+
+
+def create_users(count, prefix='bench'):
+    get_user_model().objects.bulk_create(
+        [
+            get_user_model()(
+                username=f'{prefix}{number}',
+                email=f'{prefix}{number}@example.com',
+                first_name='Имя',
+                last_name='Фамилия',
+                password='!'
+            )
+            for number in range(count)
+        ],
+        batch_size=BATCH_SIZE
+    )
+    return list(
+        get_user_model().objects.filter(
+            username__startswith=prefix
+        ).order_by('pk')
+    )
+
+
+def create_ingredients(count):
+    Ingredient.objects.bulk_create(
+        [
+            Ingredient(name=f'ингредиент {number:05}', measurement_unit='г')
+            for number in range(count)
+        ],
+        batch_size=BATCH_SIZE
+    )
+    return list(Ingredient.objects.values_list('pk', flat=True))
+
+
+def create_recipes(count, authors, ingredients, per_recipe=8, seed=1):
+    """Создаёт рецепты пачками и заполняет денормализованные поля,
+    которые bulk_create не пересчитывает.
+    """
+    rng = random.Random(seed)
+    now = timezone.now()
+    created = 0
+    while created < count:
+        size = min(BATCH_SIZE, count - created)
+        recipes = Recipe.objects.bulk_create([
+            Recipe(
+                author=rng.choice(authors),
+                name=f'{rng.choice(WORDS)} {created + number}',
+                text=' '.join(rng.choices(WORDS, k=12)),
+                image='recipes/bench.png',
+                cooking_time=rng.randint(5, 180)
+            )
+            for number in range(size)
+        ])
+        # Рецепты созданы в разное время, как настоящие
+        for number, recipe in enumerate(recipes, start=created):
+            recipe.created_at = now - timedelta(minutes=count - number)
+        Recipe.objects.bulk_update(recipes, ['created_at'], batch_size=1000)
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(
+                    recipe=recipe, ingredient_id=ingredient,
+                    amount=rng.randint(1, 500)
+                )
+                for recipe in recipes
+                for ingredient in rng.sample(ingredients, per_recipe)
+            ],
+            batch_size=BATCH_SIZE
+        )
+        created += size
+    pks = Recipe.objects.values('pk')
+    update_ingredient_ids(pks)
+    update_search_vectors(pks)
+    if is_postgresql():
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
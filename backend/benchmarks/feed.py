@@ -0,0 +1,98 @@
+"""Лента подписок: рассылка при публикации (push), чтение при запросе
+(pull) и гибрид, в котором рецепты популярных авторов читаются
+при запросе.
+"""
+import argparse
+import random
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APIClient
+
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+from .common import (BATCH_SIZE, bench_database, count_queries,
+                     create_ingredients, create_recipes, create_users,
+                     measure, report)
+
+
+def subscribe(readers, authors, follows, seed=1):
+    """Каждый читатель подписан на первого автора и ещё на follows
+    случайных авторов.
+    """
+    rng = random.Random(seed)
+    Subscription.objects.bulk_create(
+        [
+            Subscription(user=author, follower=reader)
+            for reader in readers
+            for author in {authors[0], *rng.sample(authors[1:], follows)}
+        ],
+        batch_size=BATCH_SIZE
+    )
+
+
+def publish(recipe):
+    FeedEntry.objects.filter(recipe=recipe).delete()
+    FeedEntry.objects.fan_out(recipe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--readers', type=int, default=5000)
+    parser.add_argument('--authors', type=int, default=200)
+    parser.add_argument('--follows', type=int, default=20)
+    parser.add_argument('--recipes', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_database():
+        readers = create_users(args.readers, 'reader')
+        authors = create_users(args.authors, 'author')
+        subscribe(readers, authors, args.follows)
+        create_recipes(args.recipes, authors, create_ingredients(200))
+        call_command('recount', stdout=StringIO())
+        popular, regular = (
+            Recipe.objects.select_related('author').filter(author=author)
+            .latest('created_at')
+            for author in authors[:2]
+        )
+        client = APIClient()
+        client.force_authenticate(readers[0])
+
+        strategies = (
+            ('push', args.readers),
+            ('pull', -1),
+            # Рассылаются рецепты всех авторов, кроме первого,
+            # на которого подписаны все читатели
+            ('гибрид', args.readers - 1),
+        )
+        rows = []
+        for name, max_followers in strategies:
+            with override_settings(FEED_FANOUT_MAX_FOLLOWERS=max_followers):
+                FeedEntry.objects.rebuild()
+                entries = FeedEntry.objects.count()
+                for title, func in (
+                    (f'{name}: лента, {entries} записей', lambda: client.get(
+                        '/api/recipes/feed/', {'limit': 10}
+                    )),
+                    (f'{name}: рецепт популярного автора',
+                     lambda: publish(popular)),
+                    (f'{name}: рецепт обычного автора',
+                     lambda: publish(regular)),
+                ):
+                    rows.append((
+                        title,
+                        measure(func, args.repeat),
+                        count_queries(func)
+                    ))
+        report(
+            f'Лента подписок, {args.readers} читателей, '
+            f'{args.authors} авторов, {args.recipes} рецептов',
+            rows
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""Фильтры по ингредиентам: массив ingredient_ids с GIN-индексом
+против запросов ORM по RecipeIngredient.
+"""
+import argparse
+
+from recipes.ingredient_sets import (by_pantry_coverage, count_ingredients,
+                                     has_ingredients, with_all_ingredients,
+                                     with_any_ingredients,
+                                     without_ingredients)
+from recipes.models import Recipe
+from recipes.search import is_postgresql
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+
+def page(queryset):
+    return lambda: list(
+        queryset.order_by(*Recipe._meta.ordering, '-id')[:10]
+    )
+
+
+def naive_all(ids):
+    queryset = Recipe.objects.all()
+    for ingredient in ids:
+        queryset = queryset.filter(ingredients=ingredient)
+    return queryset.distinct()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=20_000)
+    parser.add_argument('--ingredients', type=int, default=200)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_database():
+        ingredients = create_ingredients(args.ingredients)
+        create_recipes(args.recipes, create_users(50), ingredients)
+        wanted = ingredients[:2]
+        pantry = ingredients[:20]
+
+        cases = [
+            ('naive: JOIN на каждый ингредиент', naive_all(wanted)),
+            (
+                'fallback: все ингредиенты (COUNT)',
+                Recipe.objects.alias(
+                    matched=count_ingredients(wanted)
+                ).filter(matched=len(wanted))
+            ),
+            (
+                'fallback: любой ингредиент (EXISTS)',
+                Recipe.objects.filter(has_ingredients(wanted))
+            ),
+            (
+                'fallback: без ингредиентов (NOT EXISTS)',
+                Recipe.objects.exclude(has_ingredients(wanted))
+            ),
+        ]
+        if is_postgresql():
+            # На PostgreSQL функции ingredient_sets читают ingredient_ids
+            cases += [
+                (
+                    'ingredient_ids: все ингредиенты',
+                    with_all_ingredients(Recipe.objects.all(), wanted)
+                ),
+                (
+                    'ingredient_ids: любой ингредиент',
+                    with_any_ingredients(Recipe.objects.all(), wanted)
+                ),
+                (
+                    'ingredient_ids: без ингредиентов',
+                    without_ingredients(Recipe.objects.all(), wanted)
+                ),
+            ]
+        rows = [
+            (name, measure(page(queryset), args.repeat),
+             count_queries(page(queryset)))
+            for name, queryset in cases
+        ]
+        pantry_page = by_pantry_coverage(Recipe.objects.all(), pantry)
+        rows.append((
+            'покрытие набором из 20 ингредиентов',
+            measure(lambda: list(pantry_page[:10]), args.repeat),
+            count_queries(lambda: list(pantry_page[:10]))
+        ))
+        report(
+            f'Фильтры по ингредиентам, {args.recipes} рецептов, '
+            f'{args.ingredients} ингредиентов',
+            rows
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Поиск ингредиентов по началу названия: индекс в памяти процесса
+против запроса ORM, отдельно функция поиска и запрос к API.
+"""
+import argparse
+from pathlib import Path
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+from recipes.serializers import IngredientSerializer
+
+from .common import bench_database, count_queries, measure, report
+
+CATALOG = Path(__file__).resolve().parents[2] / 'data' / 'ingredients.csv'
+PREFIXES = ('а', 'мол', 'картофель', 'сыр', 'я')
+
+
+def orm_search(prefix):
+    return IngredientSerializer(
+        Ingredient.objects.filter(name__istartswith=prefix), many=True
+    ).data
+
+
+def index_search(prefix):
+    return ingredient_index.search([prefix])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--catalog', default=str(CATALOG))
+    parser.add_argument('--repeat', type=int, default=200)
+    args = parser.parse_args()
+
+    with bench_database():
+        call_command('load_ingredients', args.catalog, verbosity=0)
+        client = APIClient()
+        rows = []
+        for prefix in PREFIXES:
+            found = len(index_search(prefix))
+            assert found == len(orm_search(prefix))
+            rows += [
+                (
+                    f'ORM, «{prefix}» ({found})',
+                    measure(lambda: orm_search(prefix), args.repeat),
+                    count_queries(lambda: orm_search(prefix))
+                ),
+                (
+                    f'индекс, «{prefix}» ({found})',
+                    measure(lambda: index_search(prefix), args.repeat),
+                    count_queries(lambda: index_search(prefix))
+                ),
+                (
+                    f'API /api/ingredients/?name={prefix}',
+                    measure(
+                        lambda: client.get(
+                            '/api/ingredients/', {'name': prefix}
+                        ),
+                        args.repeat
+                    ),
+                    count_queries(
+                        lambda: client.get(
+                            '/api/ingredients/', {'name': prefix}
+                        )
+                    )
+                ),
+            ]
+        report(
+            f'Поиск ингредиентов, {Ingredient.objects.count()} в каталоге',
+            rows
+        )
+
+
+if __name__ == '__main__':
+    main()
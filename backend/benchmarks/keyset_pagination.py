@@ -0,0 +1,63 @@
+"""Глубокие страницы списка рецептов: OFFSET против курсора."""
+import argparse
+
+from rest_framework.test import APIClient
+
+from api.paginator import KeysetPagination, RecipePaginator
+from recipes.models import Recipe
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+LIMIT = 10
+
+
+def cursor_after(position, ordering):
+    """Курсор страницы, которая начинается с рецепта номер position."""
+    paginator = KeysetPagination(ordering=ordering)
+    recipe = Recipe.objects.order_by(*ordering)[position - 1]
+    return paginator.encode_cursor(recipe)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_database():
+        users = create_users(50)
+        create_recipes(args.recipes, users, create_ingredients(200))
+        # Анонимные ответы кешируются целиком, измеряем сами запросы
+        client = APIClient()
+        client.force_authenticate(users[0])
+        ordering = RecipePaginator.keyset_ordering
+        rows = []
+        for page in (1, args.recipes // LIMIT // 2, args.recipes // LIMIT):
+            offset_params = {'page': page, 'limit': LIMIT}
+            cursor_params = {'limit': LIMIT, 'cursor': (
+                cursor_after((page - 1) * LIMIT, ordering) if page > 1 else ''
+            )}
+            assert (
+                client.get('/api/recipes/', offset_params).data['results']
+                == client.get('/api/recipes/', cursor_params).data['results']
+            )
+            for name, params in (
+                (f'OFFSET, страница {page}', offset_params),
+                (f'курсор, страница {page}', cursor_params),
+            ):
+                rows.append((
+                    name,
+                    measure(
+                        lambda: client.get('/api/recipes/', params),
+                        args.repeat
+                    ),
+                    count_queries(
+                        lambda: client.get('/api/recipes/', params)
+                    )
+                ))
+        report(f'Список рецептов, {args.recipes} рецептов', rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,112 @@
+"""Обновление ингредиентов рецепта: полная замена строк, как раньше,
+против применения разницы (RecipeSerializer.recipe_ingredient_apply).
+
+Рецепт лежит в корзинах пользователей, поэтому каждое изменение
+пересчитывает и их списки покупок. Замеры чередуют два состояния
+рецепта, так что каждое обновление действительно что-то меняет.
+"""
+import argparse
+from itertools import cycle
+
+from django.db import transaction
+
+from recipes.models import (Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, ShoppingListItem)
+from recipes.serializers import RecipeSerializer
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+
+def full_replace(recipe, amounts):
+    """Замена всех ингредиентов до перехода на разницу."""
+    with transaction.atomic():
+        totals = ShoppingListItem.objects.recipe_amounts(recipe, sign=-1)
+        recipe.ingredient_amount.all().delete()
+        RecipeIngredient.objects.bulk_create([
+            RecipeIngredient(
+                recipe=recipe, ingredient_id=ingredient, amount=amount
+            )
+            for ingredient, amount in amounts.items()
+        ])
+        for ingredient, amount in amounts.items():
+            totals[ingredient] = totals.get(ingredient, 0) + amount
+        ShoppingListItem.objects.change_totals(
+            ShoppingCart.objects.filter(
+                recipe=recipe
+            ).values_list('user', flat=True),
+            totals
+        )
+
+
+def apply_diff(recipe, amounts):
+    with transaction.atomic():
+        RecipeSerializer().recipe_ingredient_apply(recipe, [
+            {'ingredient': Ingredient(pk=ingredient), 'amount': amount}
+            for ingredient, amount in amounts.items()
+        ])
+
+
+def alternate(update, recipe, states):
+    states = cycle(states)
+    return lambda: update(recipe, next(states))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--ingredients', type=int, default=60)
+    parser.add_argument('--carts', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_database():
+        ingredients = create_ingredients(args.ingredients + 10)
+        users = create_users(args.carts)
+        create_recipes(
+            1, users, ingredients[:args.ingredients],
+            per_recipe=args.ingredients
+        )
+        recipe = Recipe.objects.get()
+        ShoppingCart.objects.bulk_create(
+            [ShoppingCart(user=user, recipe=recipe) for user in users]
+        )
+        ShoppingListItem.objects.add_recipe(
+            [user.pk for user in users], recipe
+        )
+
+        base = dict(
+            recipe.ingredient_amount.values_list('ingredient', 'amount')
+        )
+        one_amount = {**base, ingredients[0]: base[ingredients[0]] + 1}
+        replaced = {
+            **{
+                ingredient: amount
+                for ingredient, amount in base.items()
+                if ingredient not in ingredients[:5]
+            },
+            **dict.fromkeys(ingredients[-5:], 100)
+        }
+        rows = []
+        for name, changed in (
+            ('одно количество', one_amount),
+            ('5 ингредиентов заменены', replaced),
+        ):
+            for title, update in (
+                ('полная замена', full_replace),
+                ('разница', apply_diff),
+            ):
+                func = alternate(update, recipe, (changed, base))
+                rows.append((
+                    f'{title}, {name}',
+                    measure(func, args.repeat),
+                    count_queries(func)
+                ))
+        report(
+            f'Обновление рецепта из {args.ingredients} ингредиентов '
+            f'в {args.carts} корзинах',
+            rows
+        )
+
+
+if __name__ == '__main__':
+    main()
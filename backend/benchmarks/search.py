@@ -0,0 +1,67 @@
+"""Поиск рецептов: search_recipes против наивного поиска подстрок.
+
+На PostgreSQL страница результатов по миллиону рецептов должна
+собираться быстрее TARGET_MS.
+"""
+import argparse
+
+from django.db.models import Q
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe
+from recipes.search import search_recipes
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+QUERIES = ('борщ', 'пирог блины', 'ингредиент 00042')
+TARGET_MS = 20
+
+
+def naive_search(value):
+    queryset = Recipe.objects.all()
+    for term in value.split():
+        queryset = queryset.filter(
+            Q(name__icontains=term) | Q(text__icontains=term)
+            | Q(ingredients__name__icontains=term)
+        )
+    return queryset.distinct()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=1_000_000)
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    with bench_database():
+        users = create_users(50)
+        create_recipes(args.recipes, users, create_ingredients(200))
+        # Анонимные ответы кешируются целиком, измеряем сами запросы
+        client = APIClient()
+        client.force_authenticate(users[0])
+        rows = []
+        for value in QUERIES:
+            for name, func in (
+                ('наивный', lambda: list(naive_search(value)[:10])),
+                ('search_recipes', lambda: list(
+                    search_recipes(Recipe.objects.all(), value)[:10]
+                )),
+                ('API', lambda: client.get(
+                    '/api/recipes/', {'search': value}
+                )),
+            ):
+                rows.append((
+                    f'{name}, «{value}»',
+                    measure(func, args.repeat),
+                    count_queries(func)
+                ))
+        report(
+            f'Поиск рецептов, {args.recipes} рецептов, '
+            f'цель {TARGET_MS} ms',
+            rows
+        )
+
+
+if __name__ == '__main__':
+    main()
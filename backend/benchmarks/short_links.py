@@ -0,0 +1,92 @@
+"""Переходы по коротким ссылкам /s/<code>.
+
+Главный результат — запросы в секунду через весь стек middleware,
+как их видит клиент. Ниже отдельно время одного представления: кеш
+путей рецептов против загрузки рецепта на каждый запрос. Оно
+показывает вклад кеша, но не пропускную способность сервиса.
+"""
+import argparse
+import random
+
+from django.http import HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.test import Client, RequestFactory
+
+from recipes import shortlinks
+from recipes.models import Recipe
+
+from .common import (bench_database, count_queries, create_ingredients,
+                     create_recipes, create_users, measure, report)
+
+
+def naive_redirect(request, code):
+    """Перенаправление без кеша, как до появления recipe_path."""
+    recipe = get_object_or_404(Recipe, pk=shortlinks.decode(code))
+    return HttpResponseRedirect(f'/recipes/{recipe.pk}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--recipes', type=int, default=100_000)
+    parser.add_argument('--links', type=int, default=1000)
+    parser.add_argument('--repeat', type=int, default=10)
+    args = parser.parse_args()
+
+    with bench_database():
+        create_recipes(args.recipes, create_users(10), create_ingredients(50))
+        pks = list(Recipe.objects.values_list('pk', flat=True))
+        codes = [
+            shortlinks.encode(pk)
+            for pk in random.Random(1).sample(pks, args.links)
+        ]
+        factory = RequestFactory()
+        client = Client()
+
+        def cold(code):
+            shortlinks.recipe_path.cache_clear()
+            shortlinks.short_link_redirect(factory.get(f'/s/{code}'), code)
+
+        def cold_request(code):
+            shortlinks.recipe_path.cache_clear()
+            client.get(f'/s/{code}')
+
+        end_to_end = (
+            ('кеш заполнен', lambda code: client.get(f'/s/{code}')),
+            ('пустой кеш', cold_request),
+        )
+        views = (
+            ('без кеша, загрузка рецепта', lambda code: naive_redirect(
+                factory.get(f'/s/{code}'), code
+            )),
+            ('recipe_path, пустой кеш', cold),
+            ('recipe_path, кеш заполнен', lambda code: (
+                shortlinks.short_link_redirect(
+                    factory.get(f'/s/{code}'), code
+                )
+            )),
+        )
+
+        def run(cases):
+            rows = []
+            for name, func in cases:
+                # Время на все ссылки, число запросов — на одну
+                timing = measure(
+                    lambda: [func(code) for code in codes], args.repeat
+                )
+                rows.append((
+                    name, timing, count_queries(lambda: func(codes[0]))
+                ))
+            return rows
+
+        rows = run(end_to_end)
+        per_second = len(codes) / rows[0][1]['median'] * 1000
+        report(
+            f'GET /s/<code> через middleware: {per_second:,.0f} '
+            f'переходов/с ({args.links} ссылок на {args.recipes} рецептов)',
+            rows
+        )
+        report('Только представление, без middleware', run(views))
+
+
+if __name__ == '__main__':
+    main()
@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 import os
+from datetime import datetime
 from pathlib import Path
 from dotenv import load_dotenv
 
@@ -103,6 +104,75 @@ DATABASES = {
     }
 }
 
+# Тесты и бенчмарки можно запускать без PostgreSQL: DB_ENGINE=sqlite.
+# Возможности PostgreSQL (полнотекстовый поиск, массивы id
+# ингредиентов) в этом режиме заменяются запросами по RecipeIngredient.
+if os.getenv('DB_ENGINE') == 'sqlite':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+            'OPTIONS': {
+                # Транзакция сразу берёт блокировку записи, параллельные
+                # запросы ждут её, а не получают «database is locked»
+                'transaction_mode': 'IMMEDIATE',
+                'timeout': 20,
+            },
+            # Файл, а не база в памяти: её видят все потоки теста
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
+
+RECIPE_CACHE_TIMEOUT = int(os.getenv('RECIPE_CACHE_TIMEOUT', 5 * 60))
+RECIPE_COUNT_CACHE_TIMEOUT = int(os.getenv('RECIPE_COUNT_CACHE_TIMEOUT', 30))
+# Сколько секунд процесс может отдавать каталог ингредиентов
+# без проверки, не изменился ли он в другом процессе
+INGREDIENT_CATALOG_TTL = int(os.getenv('INGREDIENT_CATALOG_TTL', 60))
+# Оценка количества рецептов по статистике PostgreSQL вместо COUNT(*)
+RECIPE_ESTIMATED_COUNT = os.getenv('RECIPE_ESTIMATED_COUNT') == 'True'
+# Рецепты авторов с большим числом подписчиков не рассылаются по лентам,
+# а читаются при запросе ленты
+FEED_FANOUT_MAX_FOLLOWERS = int(os.getenv('FEED_FANOUT_MAX_FOLLOWERS', 1000))
+FEED_BACKFILL_SIZE = int(os.getenv('FEED_BACKFILL_SIZE', 100))
+# Период полураспада вклада добавления в избранное или корзину
+# в оценку трендовых рецептов
+TRENDING_HALF_LIFE_DAYS = float(os.getenv('TRENDING_HALF_LIFE_DAYS', 7))
+# Отсчёт времени для вкладов в оценку. После переноса на более
+# позднюю дату оценки пересчитываются командой recount
+TRENDING_EPOCH = datetime.fromisoformat(
+    os.getenv('TRENDING_EPOCH', '2025-01-01T00:00:00+00:00')
+)
+# Миниатюры изображений строятся в фоне. Очередь можно заменить
+# классом с методом submit(task, *args)
+IMAGE_TASK_BACKEND = os.getenv(
+    'IMAGE_TASK_BACKEND', 'recipes.images.ThreadPoolBackend'
+)
+IMAGE_WORKERS = int(os.getenv('IMAGE_WORKERS', 2))
+# Изображения передаются в JSON в base64, поэтому тело запроса
+# ограничено так же, как в nginx (client_max_body_size 10M)
+DATA_UPLOAD_MAX_MEMORY_SIZE = 10 * 1024 * 1024
+IMAGE_UPLOAD_MAX_SIZE = int(
+    os.getenv('IMAGE_UPLOAD_MAX_SIZE', 7 * 1024 * 1024)
+)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -1,4 +1,5 @@
 from django.contrib import admin
+from django.db import transaction
 
 from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
                      ShoppingCart)
@@ -12,14 +13,11 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('id', 'name', 'author', 'favorites_count')
+    list_display = ('id', 'name', 'author', 'favorites_count', 'carts_count')
     list_filter = ()
+    list_select_related = ('author', )
     search_fields = ('name', 'author__username')
-
-    def favorites_count(self, obj):
-        return obj.favorited_recipes.count()
-
-    favorites_count.short_description = 'В избранном'
+    readonly_fields = ('favorites_count', 'carts_count')
 
 
 @admin.register(RecipeIngredient)
@@ -27,6 +25,12 @@ class RecipeIngredientAdmin(admin.ModelAdmin):
     list_filter = ()
     search_fields = ('recipe__name', 'ingredient__name')
 
+    def delete_queryset(self, request, queryset):
+        # По одной строке, чтобы сигналы пересчитали списки покупок
+        with transaction.atomic():
+            for recipe_ingredient in queryset:
+                recipe_ingredient.delete()
+
 
 @admin.register(Favorite)
 class FavoriteAdmin(admin.ModelAdmin):
@@ -0,0 +1,97 @@
+"""Кодирование заглушек изображений в формат BlurHash.
+
+https://github.com/woltapp/blurhash/blob/master/Algorithm.md
+"""
+import math
+
+from PIL import Image
+
+CHARACTERS = (
+    '0123456789ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+    'abcdefghijklmnopqrstuvwxyz#$%*+,-.:;=?@[]^_{|}~'
+)
+# Компоненты считаются по уменьшенной копии, на результат это почти
+# не влияет, а время кодирования не зависит от размера изображения.
+SAMPLE_SIZE = (32, 32)
+
+
+def base83(value, length):
+    return ''.join(
+        CHARACTERS[value // 83 ** (length - 1 - position) % 83]
+        for position in range(length)
+    )
+
+
+def srgb_to_linear(value):
+    value = value / 255
+    if value <= 0.04045:
+        return value / 12.92
+    return ((value + 0.055) / 1.055) ** 2.4
+
+
+def linear_to_srgb(value):
+    value = max(0, min(1, value))
+    if value <= 0.0031308:
+        return int(value * 12.92 * 255 + 0.5)
+    return int((1.055 * value ** (1 / 2.4) - 0.055) * 255 + 0.5)
+
+
+SRGB_TO_LINEAR = [srgb_to_linear(value) for value in range(256)]
+
+
+def sign_pow(value, exponent):
+    return math.copysign(abs(value) ** exponent, value)
+
+
+def encode(image, x_components=4, y_components=3):
+    image = image.convert('RGB')
+    image.thumbnail(SAMPLE_SIZE, Image.Resampling.BILINEAR)
+    width, height = image.size
+    pixels = [
+        tuple(SRGB_TO_LINEAR[channel] for channel in pixel)
+        for pixel in image.getdata()
+    ]
+
+    factors = []
+    for j in range(y_components):
+        rows = [math.cos(math.pi * j * y / height) for y in range(height)]
+        for i in range(x_components):
+            columns = [
+                math.cos(math.pi * i * x / width) for x in range(width)
+            ]
+            red = green = blue = 0
+            for y, row in enumerate(rows):
+                for x, column in enumerate(columns):
+                    basis = row * column
+                    pixel = pixels[y * width + x]
+                    red += basis * pixel[0]
+                    green += basis * pixel[1]
+                    blue += basis * pixel[2]
+            scale = (1 if i == j == 0 else 2) / (width * height)
+            factors.append((red * scale, green * scale, blue * scale))
+
+    dc, ac = factors[0], factors[1:]
+    result = base83((x_components - 1) + (y_components - 1) * 9, 1)
+    if ac:
+        actual_maximum = max(abs(value) for factor in ac for value in factor)
+        quantised_maximum = max(0, min(82, int(actual_maximum * 166 - 0.5)))
+        maximum = (quantised_maximum + 1) / 166
+    else:
+        quantised_maximum = 0
+        maximum = 1
+    result += base83(quantised_maximum, 1)
+    result += base83(
+        (linear_to_srgb(dc[0]) << 16)
+        + (linear_to_srgb(dc[1]) << 8)
+        + linear_to_srgb(dc[2]),
+        4
+    )
+    for factor in ac:
+        red, green, blue = (
+            max(0, min(18, int(
+                math.floor(sign_pow(value / maximum, 0.5) * 9 + 9.5)
+            )))
+            for value in factor
+        )
+        result += base83(red * 19 * 19 + green * 19 + blue, 2)
+    return result
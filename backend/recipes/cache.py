@@ -0,0 +1,93 @@
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework import status
+from rest_framework.response import Response
+
+LIST_VERSION_KEY = 'recipes:list:version'
+RECIPE_VERSION_KEY = 'recipes:{pk}:version'
+USER_VERSION_KEY = 'recipes:user:{pk}:version'
+
+
+def get_version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def invalidate_recipe_list():
+    cache.set(LIST_VERSION_KEY, uuid.uuid4().hex, None)
+
+
+def invalidate_recipes(pks):
+    """Сбрасывает кеш страниц отдельных рецептов и всех списков."""
+    cache.delete_many([RECIPE_VERSION_KEY.format(pk=pk) for pk in pks])
+    invalidate_recipe_list()
+
+
+def invalidate_user_recipes(user_id):
+    """Сбрасывает закешированные данные, зависящие от избранного
+    и корзины пользователя.
+    """
+    cache.delete(USER_VERSION_KEY.format(pk=user_id))
+
+
+def params_signature(request):
+    params = sorted(
+        (key, value)
+        for key, values in request.query_params.lists()
+        for value in values
+    )
+    return hashlib.md5(urlencode(params).encode()).hexdigest()
+
+
+class AnonymousResponseCacheMixin:
+    """Кеширует ответы list и retrieve для анонимных пользователей.
+
+    Ответ анонимному пользователю не зависит от пользователя, поэтому его
+    можно хранить в кеше по нормализованным параметрам запроса. Ключи
+    содержат версии, которые сбрасываются сигналами при изменении
+    рецептов, их ингредиентов и авторов.
+    """
+
+    def get_cached(self, key):
+        data = cache.get(key)
+        if data is not None:
+            return Response(data)
+        return None
+
+    def set_cached(self, key, response):
+        if response.status_code == status.HTTP_200_OK:
+            cache.set(key, response.data, settings.RECIPE_CACHE_TIMEOUT)
+        return response
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+
+        key = 'recipes:list:{version}:{signature}'.format(
+            version=get_version(LIST_VERSION_KEY),
+            signature=params_signature(request)
+        )
+        return self.get_cached(key) or self.set_cached(
+            key, super().list(request, *args, **kwargs)
+        )
+
+    def retrieve(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().retrieve(request, *args, **kwargs)
+
+        pk = kwargs[self.lookup_url_kwarg or self.lookup_field]
+        key = 'recipes:{pk}:{version}:{signature}'.format(
+            pk=pk,
+            version=get_version(RECIPE_VERSION_KEY.format(pk=pk)),
+            signature=params_signature(request)
+        )
+        return self.get_cached(key) or self.set_cached(
+            key, super().retrieve(request, *args, **kwargs)
+        )
@@ -2,3 +2,4 @@ MIN_COOKING_TIME = 1
 MAX_COOKING_TIME = 32_000
 MIN_INGREDIENT_AMOUNT = 1
 MAX_INGREDIENT_AMOUNT = 32_000
+MAX_BATCH_SIZE = 100
@@ -1,17 +1,60 @@
+from django import forms
+from django.db.models import F
 from django_filters import FilterSet
-from django_filters.rest_framework import BooleanFilter
+from django_filters.rest_framework import (BaseInFilter, BooleanFilter,
+                                           CharFilter, ChoiceFilter,
+                                           NumberFilter)
 from rest_framework.filters import SearchFilter
 
+from .ingredient_sets import (by_pantry_coverage, with_all_ingredients,
+                              with_any_ingredients, without_ingredients)
 from .models import Recipe
+from .search import search_recipes
+
+RECIPE_ANNOTATIONS = {
+    'popular': {'popularity': F('favorites_count') + F('carts_count')},
+}
+RECIPE_ORDERINGS = {
+    'popular': ('-popularity', '-id'),
+    'trending': ('-trending_score', '-id'),
+}
+ORDERING_CHOICES = (
+    ('popular', 'Популярные'),
+    ('trending', 'Популярные за последнее время'),
+)
+INGREDIENTS_MATCH_CHOICES = (
+    ('all', 'Все ингредиенты'),
+    ('any', 'Любой из ингредиентов'),
+)
 
 
 class IngredientSearchFilter(SearchFilter):
     search_param = 'name'
 
 
+class IntegerInFilter(BaseInFilter, NumberFilter):
+    field_class = forms.IntegerField
+
+
 class RecipeFilter(FilterSet):
     is_favorited = BooleanFilter(method='filter_is_favorited')
     is_in_shopping_cart = BooleanFilter(method='filter_is_in_shopping_cart')
+    search = CharFilter(method='filter_search')
+    ingredients = IntegerInFilter(method='filter_ingredients')
+    ingredients_match = ChoiceFilter(
+        choices=INGREDIENTS_MATCH_CHOICES,
+        method='filter_ingredients_match'
+    )
+    exclude_ingredients = IntegerInFilter(method='filter_exclude_ingredients')
+    cooking_time_max = NumberFilter(
+        field_name='cooking_time',
+        lookup_expr='lte'
+    )
+    pantry = IntegerInFilter(method='filter_pantry')
+    ordering = ChoiceFilter(
+        choices=ORDERING_CHOICES,
+        method='filter_ordering'
+    )
 
     class Meta:
         model = Recipe
@@ -28,3 +71,29 @@ class RecipeFilter(FilterSet):
                 recipes_in_shopping_cart__user=self.request.user
             )
         return queryset
+
+    def filter_search(self, queryset, name, value):
+        return search_recipes(queryset, value)
+
+    def filter_ingredients(self, queryset, name, value):
+        if self.form.cleaned_data.get('ingredients_match') == 'any':
+            return with_any_ingredients(queryset, value)
+        return with_all_ingredients(queryset, value)
+
+    def filter_ingredients_match(self, queryset, name, value):
+        # Режим сопоставления учитывается в filter_ingredients
+        return queryset
+
+    def filter_exclude_ingredients(self, queryset, name, value):
+        return without_ingredients(queryset, value)
+
+    def filter_pantry(self, queryset, name, value):
+        return by_pantry_coverage(queryset, value)
+
+    def filter_ordering(self, queryset, name, value):
+        # Порядок совпадает с индексами recipe_popularity_idx
+        # и recipe_trending_score_idx. Популярность аннотирована,
+        # чтобы пагинация по ключу могла сохранить её в курсоре.
+        return queryset.annotate(
+            **RECIPE_ANNOTATIONS.get(value, {})
+        ).order_by(*RECIPE_ORDERINGS[value])
@@ -0,0 +1,215 @@
+import logging
+import posixpath
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache, partial
+from io import BytesIO
+
+from django.apps import apps
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import connections, transaction
+from django.dispatch import Signal
+from django.utils.module_loading import import_string
+from PIL import Image, ImageOps
+
+from . import blurhash
+
+logger = logging.getLogger(__name__)
+
+RECIPE_IMAGE_WIDTHS = (320, 640, 1280)
+AVATAR_WIDTHS = (64, 128, 256)
+THUMBNAIL_FORMATS = (
+    ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    ('jpeg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+# Отправляется, когда миниатюры изображения сохранены в базе
+thumbnails_ready = Signal()
+
+
+class ThreadPoolBackend:
+    """Обрабатывает изображения в пуле потоков процесса."""
+
+    def __init__(self):
+        self.executor = ThreadPoolExecutor(
+            max_workers=settings.IMAGE_WORKERS,
+            thread_name_prefix='images'
+        )
+
+    def run(self, task, *args):
+        try:
+            task(*args)
+        finally:
+            # У каждого потока пула своё соединение с базой
+            connections.close_all()
+
+    def submit(self, task, *args):
+        self.executor.submit(self.run, task, *args)
+
+
+class ImmediateBackend:
+    """Обрабатывает изображения сразу, в том же потоке."""
+
+    def submit(self, task, *args):
+        task(*args)
+
+
+@lru_cache(maxsize=None)
+def get_backend():
+    return import_string(settings.IMAGE_TASK_BACKEND)()
+
+
+def thumbnails_field(field_name):
+    return f'{field_name}_thumbnails'
+
+
+def thumbnails_outdated(instance, field_name, widths):
+    image = getattr(instance, field_name)
+    thumbnails = getattr(instance, thumbnails_field(field_name))
+    if not image:
+        return thumbnails is not None
+    return (
+        thumbnails is None
+        or thumbnails['source'] != image.name
+        or thumbnails['widths'] != list(widths)
+    )
+
+
+def schedule_thumbnails(instance, field_name, widths):
+    """Ставит в очередь построение миниатюр после коммита,
+    если изображение изменилось.
+    """
+    if not thumbnails_outdated(instance, field_name, widths):
+        return
+    transaction.on_commit(partial(
+        get_backend().submit, build_thumbnails,
+        instance._meta.label_lower, instance.pk, field_name, tuple(widths)
+    ))
+
+
+def flatten(image):
+    """Приводит изображение к RGB, прозрачность заливает белым."""
+    image = ImageOps.exif_transpose(image)
+    if image.mode in ('RGBA', 'LA', 'P'):
+        image = image.convert('RGBA')
+        background = Image.new('RGB', image.size, (255, 255, 255))
+        background.paste(image, mask=image.getchannel('A'))
+        return background
+    return image.convert('RGB')
+
+
+def thumbnail_name(source, width, extension):
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    return posixpath.join(
+        directory, 'thumbnails', f'{stem}_{width}.{extension}'
+    )
+
+
+def render_thumbnails(storage, source, widths):
+    with storage.open(source, 'rb') as file, Image.open(file) as image:
+        image.draft('RGB', (max(widths), max(widths)))
+        image = flatten(image)
+    # Изображения не увеличиваем
+    fitting = [width for width in widths if width <= image.width]
+    sizes = []
+    for width in fitting or [image.width]:
+        height = max(1, round(image.height * width / image.width))
+        resized = image.resize((width, height), Image.Resampling.LANCZOS)
+        size = {'width': width, 'height': height}
+        for extension, format, options in THUMBNAIL_FORMATS:
+            name = thumbnail_name(source, width, extension)
+            # Имя исходника — хеш содержимого, поэтому готовая миниатюра
+            # с тем же именем совпадает с той, что получилась бы сейчас
+            if not default_storage.exists(name):
+                buffer = BytesIO()
+                resized.save(buffer, format, **options)
+                name = default_storage.save(
+                    name, ContentFile(buffer.getvalue())
+                )
+            size[extension] = name
+        sizes.append(size)
+    return {
+        'source': source,
+        'widths': list(widths),
+        'blurhash': blurhash.encode(image),
+        'sizes': sizes
+    }
+
+
+def thumbnail_files(thumbnails):
+    if not thumbnails:
+        return []
+    return [
+        size[extension]
+        for size in thumbnails['sizes']
+        for extension, _, _ in THUMBNAIL_FORMATS
+    ]
+
+
+def build_thumbnails(model_label, pk, field_name, widths):
+    """Строит миниатюры изображения и сохраняет их описание
+    в поле <field_name>_thumbnails.
+    """
+    model = apps.get_model(model_label)
+    field = thumbnails_field(field_name)
+    instance = model.objects.filter(pk=pk).only(field_name, field).first()
+    if instance is None:
+        return
+    image = getattr(instance, field_name)
+    source = image.name
+
+    thumbnails = None
+    if source:
+        try:
+            thumbnails = render_thumbnails(image.storage, source, widths)
+        except (OSError, Image.DecompressionBombError):
+            logger.exception('Не удалось построить миниатюры %s', source)
+            return
+
+    # Изображение могли заменить, пока строились миниатюры
+    updated = model.objects.filter(
+        pk=pk, **{field_name: source}
+    ).update(**{field: thumbnails})
+    if updated:
+        thumbnails_ready.send(sender=model, pk=pk, field_name=field_name)
+    else:
+        release_image(image.storage, source, thumbnails)
+
+
+def release_image(storage, name, thumbnails):
+    """Удаляет изображение и его миниатюры, если на изображение
+    больше не ссылается ни одна запись.
+    """
+    if not name:
+        return
+    # Пока изображение удаляется, его нельзя заново сохранить
+    # и сослаться на него
+    with storage.locked(name):
+        storage.delete(name)
+        if storage.exists(name):
+            return
+        if thumbnails and thumbnails['source'] == name:
+            for thumbnail in thumbnail_files(thumbnails):
+                default_storage.delete(thumbnail)
+
+
+def thumbnails_data(thumbnails, image):
+    """Миниатюры для ответа API или None, если они ещё строятся."""
+    if not image or not thumbnails or thumbnails['source'] != image.name:
+        return None
+    return {
+        'blurhash': thumbnails['blurhash'],
+        'sizes': [
+            {
+                'width': size['width'],
+                'height': size['height'],
+                **{
+                    extension: default_storage.url(size[extension])
+                    for extension, _, _ in THUMBNAIL_FORMATS
+                }
+            }
+            for size in thumbnails['sizes']
+        ]
+    }
@@ -0,0 +1,126 @@
+import gzip
+import hashlib
+import threading
+import uuid
+from bisect import bisect_left
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.renderers import JSONRenderer
+
+from .models import Ingredient
+
+CATALOG_VERSION_KEY = 'ingredients:version'
+
+
+def get_catalog_version():
+    """Версия каталога ингредиентов, общая для всех процессов.
+
+    Версия живёт INGREDIENT_CATALOG_TTL секунд. С кешем в памяти
+    процесса (без REDIS_URL) изменение каталога в одном процессе
+    не меняет версию в остальных, и они перестраивают индекс,
+    когда их версия истекает.
+    """
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(
+            CATALOG_VERSION_KEY, uuid.uuid4().hex,
+            settings.INGREDIENT_CATALOG_TTL
+        )
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    cache.set(
+        CATALOG_VERSION_KEY, uuid.uuid4().hex,
+        settings.INGREDIENT_CATALOG_TTL
+    )
+
+
+class RenderedCatalog(NamedTuple):
+    body: bytes
+    etag: str
+    gzip_body: bytes
+    gzip_etag: str
+
+    @classmethod
+    def render(cls, rows):
+        body = JSONRenderer().render(rows)
+        digest = hashlib.sha256(body).hexdigest()[:32]
+        return cls(
+            body=body,
+            etag=f'"{digest}"',
+            gzip_body=gzip.compress(body, mtime=0),
+            gzip_etag=f'"{digest}-gzip"'
+        )
+
+
+class IngredientPrefixIndex:
+    """Индекс ингредиентов в памяти процесса для поиска по началу названия.
+
+    Названия в нижнем регистре хранятся отсортированными, поиск идёт
+    бинарным поиском. Результаты возвращаются в порядке сортировки
+    базы данных, поэтому совпадают с выдачей запроса ``^name``.
+    Индекс строится при первом обращении и перестраивается,
+    когда меняется версия каталога. Вместе с ним готовится
+    JSON всего каталога, который отдаётся без повторной сериализации.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._version = None
+        self._state = None
+
+    def _build(self, version):
+        rows = list(
+            Ingredient.objects.values('id', 'name', 'measurement_unit')
+        )
+        entries = sorted(
+            (row['name'].lower(), rank) for rank, row in enumerate(rows)
+        )
+        # Состояние заменяется целиком, чтобы параллельные запросы
+        # не увидели ключи от одной версии, а строки от другой.
+        self._state = (
+            [key for key, _ in entries],
+            [rank for _, rank in entries],
+            rows,
+            RenderedCatalog.render(rows)
+        )
+        self._version = version
+
+    def _snapshot(self):
+        version = get_catalog_version()
+        if self._version != version:
+            with self._lock:
+                if self._version != version:
+                    self._build(version)
+        return self._state
+
+    def invalidate(self):
+        with self._lock:
+            self._version = None
+
+    def catalog(self):
+        """Весь каталог, заранее отрендеренный в JSON."""
+        return self._snapshot()[3]
+
+    def search(self, terms=()):
+        """Ингредиенты, название которых начинается с каждого из terms."""
+        keys, ranks, rows, _ = self._snapshot()
+        if not terms:
+            return rows
+
+        terms = [term.lower() for term in terms]
+        prefix = max(terms, key=len)
+        if not all(prefix.startswith(term) for term in terms):
+            return []
+
+        start = end = bisect_left(keys, prefix)
+        while end < len(keys) and keys[end].startswith(prefix):
+            end += 1
+        return [rows[rank] for rank in sorted(ranks[start:end])]
+
+
+ingredient_index = IngredientPrefixIndex()
@@ -0,0 +1,107 @@
+from django.contrib.postgres.expressions import ArraySubquery
+from django.contrib.postgres.fields import ArrayField
+from django.db.models import (BigIntegerField, Count, Exists, FloatField,
+                              Func, OuterRef, Subquery, Value)
+from django.db.models.functions import Cast, Coalesce, Greatest
+
+from .models import Recipe, RecipeIngredient
+from .search import is_postgresql
+
+
+def ingredient_ids_array(ids):
+    return Value(list(ids), output_field=ArrayField(BigIntegerField()))
+
+
+def update_ingredient_ids(pks):
+    """Пересчитывает Recipe.ingredient_ids — инвертированный индекс
+    «ингредиент → рецепты» для фильтров по ингредиентам.
+    """
+    if is_postgresql():
+        Recipe.objects.filter(pk__in=pks).update(
+            ingredient_ids=ArraySubquery(
+                RecipeIngredient.objects.filter(
+                    recipe=OuterRef('pk')
+                ).order_by('ingredient').values('ingredient')
+            )
+        )
+
+
+class PantryCoverage(Func):
+    """Доля ингредиентов рецепта, которые есть в наборе пользователя."""
+
+    output_field = FloatField()
+
+    def as_sql(self, compiler, connection, **extra_context):
+        column, pantry = self.get_source_expressions()
+        column_sql, column_params = compiler.compile(column)
+        pantry_sql, pantry_params = compiler.compile(pantry)
+        sql = (
+            'CAST(cardinality(ARRAY('
+            f'SELECT unnest({column_sql}) '
+            f'INTERSECT SELECT unnest({pantry_sql})'
+            ')) AS double precision) '
+            f'/ GREATEST(cardinality({column_sql}), 1)'
+        )
+        return sql, (*column_params, *pantry_params, *column_params)
+
+
+def has_ingredients(ids):
+    return Exists(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk'), ingredient__in=ids
+        )
+    )
+
+
+def count_ingredients(ids=None):
+    recipe_ingredients = RecipeIngredient.objects.filter(
+        recipe=OuterRef('pk')
+    )
+    if ids is not None:
+        recipe_ingredients = recipe_ingredients.filter(ingredient__in=ids)
+    return Coalesce(
+        Subquery(
+            recipe_ingredients.order_by().values('recipe').annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+def with_all_ingredients(queryset, ids):
+    if is_postgresql():
+        return queryset.filter(ingredient_ids__contains=list(ids))
+    return queryset.alias(
+        matched_ingredients=count_ingredients(ids)
+    ).filter(matched_ingredients=len(set(ids)))
+
+
+def with_any_ingredients(queryset, ids):
+    if is_postgresql():
+        return queryset.filter(ingredient_ids__overlap=list(ids))
+    return queryset.filter(has_ingredients(ids))
+
+
+def without_ingredients(queryset, ids):
+    if is_postgresql():
+        return queryset.exclude(ingredient_ids__overlap=list(ids))
+    return queryset.exclude(has_ingredients(ids))
+
+
+def by_pantry_coverage(queryset, ids):
+    """Рецепты, в которых есть хотя бы один ингредиент из набора,
+    от наиболее полно покрытых набором к наименее.
+    """
+    queryset = with_any_ingredients(queryset, ids)
+    if is_postgresql():
+        coverage = PantryCoverage(
+            'ingredient_ids', ingredient_ids_array(ids)
+        )
+    else:
+        coverage = Cast(
+            count_ingredients(ids), FloatField()
+        ) / Greatest(count_ingredients(), 1)
+    return queryset.annotate(pantry_coverage=coverage).order_by(
+        '-pantry_coverage', *Recipe._meta.ordering
+    )
@@ -0,0 +1,36 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from recipes.images import (AVATAR_WIDTHS, RECIPE_IMAGE_WIDTHS,
+                            build_thumbnails, thumbnails_field,
+                            thumbnails_outdated)
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = (
+        'Строит недостающие и устаревшие миниатюры изображений '
+        'рецептов и аватаров.'
+    )
+
+    def handle(self, *args, **options):
+        images = (
+            (Recipe, 'image', RECIPE_IMAGE_WIDTHS),
+            (get_user_model(), 'avatar', AVATAR_WIDTHS),
+        )
+        for model, field_name, widths in images:
+            built = 0
+            instances = model.objects.only(
+                field_name, thumbnails_field(field_name)
+            )
+            for instance in instances.iterator():
+                if thumbnails_outdated(instance, field_name, widths):
+                    build_thumbnails(
+                        model._meta.label_lower, instance.pk,
+                        field_name, widths
+                    )
+                    built += 1
+            self.stdout.write(
+                f'{model._meta.model_name}.{field_name}: '
+                f'обработано {built}'
+            )
@@ -0,0 +1,48 @@
+from django.core.management import call_command
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.images import release_image, thumbnails_field
+from recipes.storage import image_storage
+
+
+class Command(BaseCommand):
+    help = (
+        'Переименовывает загруженные изображения по хешу содержимого, '
+        'объединяет одинаковые файлы и перестраивает их миниатюры.'
+    )
+
+    def handle(self, *args, **options):
+        moved = {}
+        released = []
+        for model, field_name in image_storage.reference_fields():
+            thumbnails = thumbnails_field(field_name)
+            rows = model._default_manager.exclude(
+                **{f'{field_name}__isnull': True}
+            ).exclude(
+                **{field_name: ''}
+            ).values_list('pk', field_name, thumbnails)
+
+            for pk, name, previous_thumbnails in rows.iterator():
+                if image_storage.is_hashed(name):
+                    continue
+                if name not in moved and not image_storage.exists(name):
+                    self.stderr.write(f'Файл {name} не найден')
+                    continue
+                # Файл сохраняется под блокировкой до коммита ссылки
+                with transaction.atomic():
+                    if name not in moved:
+                        with image_storage.open(name, 'rb') as file:
+                            moved[name] = image_storage.save(name, file)
+                    model._default_manager.filter(pk=pk).update(
+                        **{field_name: moved[name], thumbnails: None}
+                    )
+                released.append((name, previous_thumbnails))
+
+        for name, previous_thumbnails in released:
+            release_image(image_storage, name, previous_thumbnails)
+        self.stdout.write(
+            f'Перенесено файлов: {len(moved)}, '
+            f'осталось после объединения: {len(set(moved.values()))}.'
+        )
+        call_command('build_thumbnails', stdout=self.stdout)
@@ -0,0 +1,173 @@
+import csv
+import io
+import json
+import time
+from itertools import islice
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from recipes.models import Ingredient
+from recipes.signals import invalidate_ingredient_catalog
+
+READ_BLOCK_SIZE = 64 * 1024
+
+
+def read_csv(file):
+    for line_number, row in enumerate(csv.reader(file), start=1):
+        if not row:
+            continue
+        if len(row) != 2:
+            raise CommandError(
+                f'Строка {line_number}: ожидается "название,единица"'
+            )
+        yield row
+
+
+def read_json(file):
+    """Читает JSON-массив объектов по частям, не загружая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer = ''
+    started = False
+    while True:
+        block = file.read(READ_BLOCK_SIZE)
+        buffer += block
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if not started and position < len(buffer):
+                if buffer[position] != '[':
+                    raise CommandError('Ожидается JSON-массив ингредиентов')
+                started = True
+                position += 1
+                continue
+            if position < len(buffer) and buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not block:
+                    raise CommandError('Некорректный JSON')
+                break
+            yield item['name'], item['measurement_unit']
+        buffer = buffer[position:]
+        if not block:
+            return
+
+
+def clean_rows(rows):
+    name_length = Ingredient._meta.get_field('name').max_length
+    unit_length = Ingredient._meta.get_field('measurement_unit').max_length
+    for name, measurement_unit in rows:
+        name, measurement_unit = name.strip(), measurement_unit.strip()
+        if not name or not measurement_unit:
+            continue
+        if len(name) > name_length or len(measurement_unit) > unit_length:
+            raise CommandError(f'Слишком длинное значение: {name}')
+        yield name, measurement_unit
+
+
+def chunked(rows, size):
+    rows = iter(rows)
+    while chunk := list(islice(rows, size)):
+        yield chunk
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает ингредиенты из CSV или JSON. Повторная загрузка '
+        'обновляет единицы измерения существующих ингредиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Путь к файлу .csv или .json')
+        parser.add_argument(
+            '--format',
+            choices=('csv', 'json'),
+            help='Формат файла, по умолчанию определяется по расширению.'
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=5000,
+            help='Количество строк в одной пачке.'
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        file_format = options['format'] or path.suffix.lstrip('.').lower()
+        readers = {'csv': read_csv, 'json': read_json}
+        if file_format not in readers:
+            raise CommandError(f'Неизвестный формат файла: {path}')
+
+        started = time.perf_counter()
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = clean_rows(readers[file_format](file))
+            chunks = chunked(rows, options['chunk_size'])
+            with transaction.atomic():
+                if connection.vendor == 'postgresql':
+                    total = self.copy_chunks(chunks)
+                else:
+                    total = self.upsert_chunks(chunks)
+                # bulk-операции не отправляют сигналы моделей
+                transaction.on_commit(invalidate_ingredient_catalog)
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Загружено {total} строк за {elapsed:.2f} с '
+            f'({total / elapsed if elapsed else total:.0f} строк/с)'
+        ))
+
+    def upsert_chunks(self, chunks):
+        total = 0
+        for chunk in chunks:
+            # В одном INSERT ... ON CONFLICT нельзя дважды
+            # обновить одну строку, поэтому убираем повторы:
+            # остаётся последний, следующие пачки его перезаписывают.
+            unique = dict(chunk)
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=measurement_unit)
+                    for name, measurement_unit in unique.items()
+                ],
+                update_conflicts=True,
+                unique_fields=['name'],
+                update_fields=['measurement_unit']
+            )
+            total += len(chunk)
+        return total
+
+    def copy_chunks(self, chunks):
+        """Загрузка через COPY во временную таблицу и один общий upsert."""
+        table = connection.ops.quote_name(Ingredient._meta.db_table)
+        total = 0
+        with connection.cursor() as cursor:
+            # position сохраняет порядок строк в файле: из повторов
+            # побеждает последний, как и при загрузке без COPY
+            cursor.execute(
+                'CREATE TEMPORARY TABLE ingredient_staging '
+                '(position bigserial, name text, measurement_unit text) '
+                'ON COMMIT DROP'
+            )
+            for chunk in chunks:
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(chunk)
+                buffer.seek(0)
+                cursor.copy_expert(
+                    'COPY ingredient_staging (name, measurement_unit) '
+                    'FROM STDIN WITH (FORMAT csv)',
+                    buffer
+                )
+                total += len(chunk)
+            cursor.execute(
+                f'INSERT INTO {table} (name, measurement_unit) '
+                'SELECT DISTINCT ON (name) name, measurement_unit '
+                'FROM ingredient_staging ORDER BY name, position DESC '
+                'ON CONFLICT (name) DO UPDATE '
+                'SET measurement_unit = EXCLUDED.measurement_unit '
+                f'WHERE {table}.measurement_unit '
+                'IS DISTINCT FROM EXCLUDED.measurement_unit'
+            )
+        return total
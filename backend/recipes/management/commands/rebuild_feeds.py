@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from recipes.models import FeedEntry
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает ленты подписок. Нужна после изменения '
+        'FEED_FANOUT_MAX_FOLLOWERS или когда автор перестал быть '
+        'популярным и его рецепты снова должны рассылаться.'
+    )
+
+    def handle(self, *args, **options):
+        FeedEntry.objects.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f'Ленты подписок пересобраны ({FeedEntry.objects.count()} '
+            'записей).'
+        ))
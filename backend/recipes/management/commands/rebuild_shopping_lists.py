@@ -0,0 +1,54 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from recipes.models import ShoppingListItem
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересобирает списки покупок пользователей по корзинам '
+        'и сверяет их с актуальными суммами ингредиентов.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить таблицу, не пересобирая её.'
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            ShoppingListItem.objects.rebuild()
+            self.stdout.write('Списки покупок пересобраны.')
+
+        expected = {
+            (row['user'], row['ingredient_ref']): row['total']
+            for row in ShoppingListItem.objects.live_totals().iterator()
+        }
+        stored = ShoppingListItem.objects.values_list(
+            'user', 'ingredient', 'total'
+        )
+        actual = {
+            (user, ingredient): total
+            for user, ingredient, total in stored.iterator()
+        }
+
+        mismatches = [
+            (key, actual.get(key), expected.get(key))
+            for key in expected.keys() | actual.keys()
+            if actual.get(key) != expected.get(key)
+        ]
+        for (user, ingredient), stored_total, live_total in sorted(
+            mismatches, key=lambda mismatch: mismatch[0]
+        ):
+            self.stderr.write(
+                f'Пользователь {user}, ингредиент {ingredient}: '
+                f'в таблице {stored_total}, по корзине {live_total}'
+            )
+        if mismatches:
+            raise CommandError(
+                f'Расхождений в списках покупок: {len(mismatches)}'
+            )
+        self.stdout.write(self.style.SUCCESS(
+            f'Списки покупок совпадают с корзинами ({len(actual)} строк).'
+        ))
@@ -0,0 +1,88 @@
+from django.contrib.auth import get_user_model
+from django.utils import timezone
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from recipes.ranking import (TRENDING_MAX_HALF_LIVES,
+                             TRENDING_WARNING_HALF_LIVES,
+                             trending_half_lives, trending_scores)
+from users.models import Subscription
+
+
+def count_related(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(
+                **{field: OuterRef('pk')}
+            ).order_by().values(field).annotate(
+                count=Count('pk')
+            ).values('count')
+        ),
+        0
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        'Пересчитывает денормализованные счётчики рецептов '
+        'и пользователей и исправляет расхождения. '
+        'Заново считает оценки трендовых рецептов.'
+    )
+
+    def handle(self, *args, **options):
+        counters = (
+            (Recipe, 'favorites_count', Favorite, 'recipe'),
+            (Recipe, 'carts_count', ShoppingCart, 'recipe'),
+            (get_user_model(), 'recipes_count', Recipe, 'author'),
+            (get_user_model(), 'followers_count', Subscription, 'user'),
+        )
+        with transaction.atomic():
+            for model, counter, related_model, field in counters:
+                actual = count_related(related_model, field)
+                drifted = model.objects.annotate(
+                    actual=actual
+                ).exclude(
+                    **{counter: F('actual')}
+                ).values('pk')
+                fixed = model.objects.filter(
+                    pk__in=drifted
+                ).update(**{counter: actual})
+                self.stdout.write(
+                    f'{model._meta.model_name}.{counter}: '
+                    f'исправлено {fixed}'
+                )
+
+        self.recompute_trending_scores()
+
+    def recompute_trending_scores(self, batch_size=2000):
+        scores = trending_scores(
+            Favorite.objects.values_list('recipe', 'created_at').iterator(),
+            ShoppingCart.objects.values_list(
+                'recipe', 'created_at'
+            ).iterator()
+        )
+        with transaction.atomic():
+            Recipe.objects.update(trending_score=0)
+            Recipe.objects.bulk_update(
+                [
+                    Recipe(pk=pk, trending_score=score)
+                    for pk, score in scores.items()
+                ],
+                ['trending_score'],
+                batch_size=batch_size
+            )
+        self.stdout.write(
+            f'recipe.trending_score: пересчитано {len(scores)}'
+        )
+        remaining = TRENDING_MAX_HALF_LIVES - trending_half_lives(
+            timezone.now()
+        )
+        if remaining < TRENDING_WARNING_HALF_LIVES:
+            self.stdout.write(self.style.WARNING(
+                f'Вклады событий через {remaining:.0f} периодов '
+                'полураспада перестанут расти: перенесите TRENDING_EPOCH '
+                'ближе к текущей дате и повторите recount.'
+            ))
@@ -0,0 +1,63 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:10
+
+import math
+from collections import defaultdict
+from datetime import datetime, timezone
+
+import django.db.models.expressions
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+# Копия recipes.ranking на момент миграции: код приложения может
+# измениться, а миграция должна давать тот же результат.
+TRENDING_EPOCH = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+
+def fill_trending_scores(apps, schema_editor):
+    Favorite = apps.get_model('recipes', 'Favorite')
+    Recipe = apps.get_model('recipes', 'Recipe')
+    ShoppingCart = apps.get_model('recipes', 'ShoppingCart')
+    half_life = settings.TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60
+    scores = defaultdict(float)
+    for model in (Favorite, ShoppingCart):
+        events = model.objects.values_list('recipe', 'created_at')
+        for recipe, moment in events.iterator():
+            seconds = (moment - TRENDING_EPOCH).total_seconds()
+            scores[recipe] += math.exp(math.log(2) * seconds / half_life)
+    Recipe.objects.bulk_update(
+        [Recipe(pk=pk, trending_score=score) for pk, score in scores.items()],
+        ['trending_score'],
+        batch_size=2000
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0021_feedentry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='favorite',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, default=django.utils.timezone.now, verbose_name='Дата добавления'),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(default=0, editable=False, verbose_name='Оценка популярности за последнее время'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(models.OrderBy(django.db.models.expressions.CombinedExpression(models.F('favorites_count'), '+', models.F('carts_count')), descending=True), models.OrderBy(models.F('id'), descending=True), name='recipe_popularity_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='recipe',
+            index=models.Index(fields=['-trending_score', '-id'], name='recipe_trending_score_idx'),
+        ),
+        migrations.RunPython(fill_trending_scores, migrations.RunPython.noop),
+    ]
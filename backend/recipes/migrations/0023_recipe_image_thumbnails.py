@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0022_recipe_trending_score'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='image_thumbnails',
+            field=models.JSONField(editable=False, null=True, verbose_name='Миниатюры изображения'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:39
+
+import recipes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0024_recipe_image_storage'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='ingredient_ids',
+            field=recipes.models.IngredientIdsField(base_field=models.BigIntegerField(), editable=False, null=True, size=None, verbose_name='Идентификаторы ингредиентов'),
+        ),
+    ]
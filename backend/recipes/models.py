@@ -1,11 +1,32 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, OpClass
+from django.contrib.postgres.search import SearchVectorField
 from django.core.validators import MinValueValidator, MaxValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Case, F, Sum, Value, When, Window
+from django.db.models.functions import RowNumber, Upper
 
 from .constraints import (
     MIN_COOKING_TIME, MAX_COOKING_TIME,
     MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT
 )
+from .storage import image_storage
+
+
+class IngredientIdsField(ArrayField):
+    """Массив id ингредиентов рецепта.
+
+    Заполняется только в PostgreSQL. В других СУБД приведение
+    к типу массива не поддерживается, поэтому значение пишется как есть
+    (всегда NULL), а фильтры по ингредиентам читают RecipeIngredient.
+    """
+
+    def get_placeholder(self, value, compiler, connection):
+        if connection.vendor != 'postgresql':
+            return '%s'
+        return super().get_placeholder(value, compiler, connection)
 
 
 class Recipe(models.Model):
@@ -21,7 +42,8 @@ class Recipe(models.Model):
     )
     image = models.ImageField(
         verbose_name='Изображение',
-        upload_to='recipes/'
+        upload_to='recipes/',
+        storage=image_storage
     )
     text = models.TextField(
         verbose_name='Описание'
@@ -42,15 +64,98 @@ class Recipe(models.Model):
         verbose_name='Дата создания',
         auto_now_add=True
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        editable=False
+    )
+    carts_count = models.PositiveIntegerField(
+        verbose_name='В корзинах',
+        default=0,
+        editable=False
+    )
+    search_vector = SearchVectorField(
+        verbose_name='Поисковый вектор',
+        null=True,
+        editable=False
+    )
+    ingredient_ids = IngredientIdsField(
+        models.BigIntegerField(),
+        verbose_name='Идентификаторы ингредиентов',
+        null=True,
+        editable=False
+    )
+    trending_score = models.FloatField(
+        verbose_name='Оценка популярности за последнее время',
+        default=0,
+        editable=False
+    )
+    image_thumbnails = models.JSONField(
+        verbose_name='Миниатюры изображения',
+        null=True,
+        editable=False
+    )
+
+    DENORMALIZED_FIELDS = (
+        'favorites_count', 'carts_count', 'search_vector', 'ingredient_ids',
+        'trending_score', 'image_thumbnails'
+    )
 
     class Meta:
         verbose_name = 'Рецепт'
         verbose_name_plural = 'Рецепты'
         ordering = ('-created_at', )
+        indexes = [
+            models.Index(
+                fields=['-created_at', '-id'],
+                name='recipe_created_at_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-created_at'],
+                name='recipe_author_created_at_idx'
+            ),
+            models.Index(
+                (F('favorites_count') + F('carts_count')).desc(),
+                F('id').desc(),
+                name='recipe_popularity_idx'
+            ),
+            models.Index(
+                fields=['-trending_score', '-id'],
+                name='recipe_trending_score_idx'
+            ),
+            models.Index(
+                fields=['image'],
+                name='recipe_image_idx'
+            ),
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='recipe_name_trgm_idx'
+            ),
+            GinIndex(
+                fields=['search_vector'],
+                name='recipe_search_vector_idx'
+            ),
+            GinIndex(
+                fields=['ingredient_ids'],
+                name='recipe_ingredient_ids_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Счётчики, поисковый вектор и миниатюры обновляются
+            # запросами UPDATE, полное сохранение не должно
+            # перезаписывать их.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
 
 class Ingredient(models.Model):
     name = models.CharField(
@@ -67,6 +172,12 @@ class Ingredient(models.Model):
         verbose_name = 'Ингредиент'
         verbose_name_plural = 'Игредиенты'
         ordering = ('name', )
+        indexes = [
+            GinIndex(
+                OpClass(Upper('name'), name='gin_trgm_ops'),
+                name='ingredient_name_trgm_idx'
+            )
+        ]
 
     def __str__(self):
         return self.name
@@ -123,6 +234,10 @@ class Favorite(models.Model):
         on_delete=models.CASCADE,
         related_name='favorited_recipes'
     )
+    created_at = models.DateTimeField(
+        verbose_name='Дата добавления',
+        auto_now_add=True
+    )
 
     class Meta:
         verbose_name = 'Избранное'
@@ -162,6 +277,12 @@ class ShoppingCart(models.Model):
         verbose_name = 'Корзина'
         verbose_name_plural = 'Корзины'
         ordering = ('-created_at', )
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at'],
+                name='cart_user_created_at_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'recipe'],
@@ -173,3 +294,303 @@ class ShoppingCart(models.Model):
         recipe_name = self.recipe.name
         username = self.user.username
         return f'{recipe_name} в корзине у {username}'
+
+
+class ShoppingListItemManager(models.Manager):
+    def change_totals(self, users, amounts):
+        """Прибавляет изменения количеств ингредиентов
+        к спискам покупок пользователей.
+
+        amounts — словарь {id ингредиента: изменение количества},
+        отрицательные значения уменьшают сумму.
+        """
+        users = list(users)
+        amounts = {
+            ingredient: amount
+            for ingredient, amount in amounts.items() if amount
+        }
+        if not users or not amounts:
+            return
+
+        with transaction.atomic():
+            self.bulk_create(
+                [
+                    self.model(user_id=user, ingredient_id=ingredient, total=0)
+                    for user in users
+                    for ingredient, amount in amounts.items() if amount > 0
+                ],
+                ignore_conflicts=True
+            )
+            items = self.filter(user__in=users, ingredient__in=amounts)
+            items.update(
+                total=F('total') + Case(
+                    *[
+                        When(ingredient=ingredient, then=Value(amount))
+                        for ingredient, amount in amounts.items()
+                    ],
+                    default=Value(0)
+                )
+            )
+            items.filter(total__lte=0).delete()
+
+    def recipe_amounts(self, recipe, sign=1):
+        return {
+            ingredient: sign * amount
+            for ingredient, amount in RecipeIngredient.objects.filter(
+                recipe=recipe
+            ).values_list('ingredient', 'amount')
+        }
+
+    def recipes_amounts(self, recipes):
+        return dict(
+            RecipeIngredient.objects.filter(
+                recipe__in=recipes
+            ).order_by().values('ingredient').annotate(
+                total=Sum('amount')
+            ).values_list('ingredient', 'total')
+        )
+
+    def add_recipe(self, users, recipe):
+        self.change_totals(users, self.recipe_amounts(recipe))
+
+    def add_recipes(self, users, recipes):
+        self.change_totals(users, self.recipes_amounts(recipes))
+
+    def remove_recipe(self, users, recipe):
+        self.change_totals(users, self.recipe_amounts(recipe, sign=-1))
+
+    def live_totals(self):
+        """Суммы ингредиентов, посчитанные напрямую по корзинам."""
+        return RecipeIngredient.objects.filter(
+            recipe__recipes_in_shopping_cart__isnull=False
+        ).values(
+            user=F('recipe__recipes_in_shopping_cart__user'),
+            ingredient_ref=F('ingredient')
+        ).annotate(
+            total=Sum('amount')
+        ).order_by()
+
+    def rebuild(self, batch_size=2000):
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=row['user'],
+                        ingredient_id=row['ingredient_ref'],
+                        total=row['total']
+                    )
+                    for row in self.live_totals().iterator()
+                ),
+                batch_size=batch_size
+            )
+
+
+class ShoppingListItem(models.Model):
+    """Сумма ингредиента в списке покупок пользователя.
+
+    Поддерживается инкрементально при изменении корзины
+    и ингредиентов рецептов: изменения через ORM учитывают сигналы,
+    запросы с RETURNING и RecipeSerializer меняют суммы сами.
+    """
+
+    user = models.ForeignKey(
+        get_user_model(),
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='shopping_list'
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        verbose_name='Ингредиент',
+        on_delete=models.CASCADE
+    )
+    total = models.IntegerField(
+        verbose_name='Количество'
+    )
+
+    objects = ShoppingListItemManager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Списки покупок'
+        ordering = ('user', )
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'ingredient'],
+                name='unique ingredient in shopping list'
+            )
+        ]
+
+    def __str__(self):
+        name = self.ingredient.name
+        measurement_unit = self.ingredient.measurement_unit
+        username = self.user.username
+        return f'{self.total} {measurement_unit} {name} у {username}'
+
+
+class FeedEntryManager(models.Manager):
+    """Лента рассылается подписчикам при публикации рецепта
+    (fan-out on write). Рецепты авторов, у которых подписчиков больше
+    FEED_FANOUT_MAX_FOLLOWERS, не рассылаются и читаются при запросе
+    ленты (fan-out on read).
+    """
+
+    def is_pushed(self, author):
+        return author.followers_count <= settings.FEED_FANOUT_MAX_FOLLOWERS
+
+    def fan_out(self, recipe, batch_size=2000):
+        if not self.is_pushed(recipe.author):
+            return
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=follower,
+                    recipe=recipe,
+                    created_at=recipe.created_at
+                )
+                for follower in recipe.author.subscriptions.values_list(
+                    'follower', flat=True
+                ).iterator()
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+    def follow(self, follower, authors):
+        """Добавляет в ленту нового подписчика последние рецепты
+        авторов, на которых он подписался.
+        """
+        authors = [author for author in authors if self.is_pushed(author)]
+        if not authors:
+            return
+        recipes = Recipe.objects.filter(author__in=authors).annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=F('author'),
+                order_by=(F('created_at').desc(), F('id').desc())
+            )
+        ).filter(
+            position__lte=settings.FEED_BACKFILL_SIZE
+        ).values_list('pk', 'created_at')
+        self.bulk_create(
+            [
+                self.model(user=follower, recipe_id=pk, created_at=created_at)
+                for pk, created_at in recipes
+            ],
+            ignore_conflicts=True
+        )
+
+    def unfollow(self, follower, author):
+        """Убирает рецепты автора из ленты бывшего подписчика.
+
+        Вызывается после уменьшения followers_count: если подписчиков
+        стало ровно FEED_FANOUT_MAX_FOLLOWERS, рецепты автора больше
+        не читаются при запросе ленты и рассылаются оставшимся.
+        """
+        self.filter(user=follower, recipe__author=author).delete()
+        author.refresh_from_db(fields=['followers_count'])
+        if author.followers_count == settings.FEED_FANOUT_MAX_FOLLOWERS:
+            self.backfill(author)
+
+    def backfill(self, author, batch_size=2000):
+        """Рассылает последние рецепты автора всем его подписчикам."""
+        recipes = list(
+            Recipe.objects.filter(author=author).order_by(
+                '-created_at', '-id'
+            ).values_list(
+                'pk', 'created_at'
+            )[:settings.FEED_BACKFILL_SIZE]
+        )
+        if not recipes:
+            return
+        self.bulk_create(
+            (
+                self.model(
+                    user_id=follower, recipe_id=pk, created_at=created_at
+                )
+                for follower in author.subscriptions.values_list(
+                    'follower', flat=True
+                ).iterator()
+                for pk, created_at in recipes
+            ),
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+
+    def sources(self, user):
+        """Источники ленты пользователя: пары (created_at, id рецепта)
+        и порядок, в котором их нужно читать.
+        """
+        pushed = self.filter(user=user).values_list('created_at', 'recipe')
+        pulled = Recipe.objects.filter(
+            author__subscriptions__follower=user,
+            author__followers_count__gt=settings.FEED_FANOUT_MAX_FOLLOWERS
+        ).values_list('created_at', 'pk')
+        return (
+            (pushed, ('-created_at', '-recipe')),
+            (pulled, ('-created_at', '-id'))
+        )
+
+    def rebuild(self, batch_size=2000):
+        recipes = Recipe.objects.filter(
+            author__followers_count__lte=settings.FEED_FANOUT_MAX_FOLLOWERS,
+            author__subscriptions__isnull=False
+        ).values_list(
+            'author__subscriptions__follower', 'pk', 'created_at'
+        ).order_by()
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(
+                (
+                    self.model(
+                        user_id=follower, recipe_id=pk, created_at=created_at
+                    )
+                    for follower, pk, created_at in recipes.iterator()
+                ),
+                batch_size=batch_size
+            )
+
+
+class FeedEntry(models.Model):
+    """Рецепт в ленте подписок пользователя."""
+
+    user = models.ForeignKey(
+        get_user_model(),
+        verbose_name='Пользователь',
+        on_delete=models.CASCADE,
+        related_name='feed'
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name='Рецепт',
+        on_delete=models.CASCADE,
+        related_name='feed_entries'
+    )
+    created_at = models.DateTimeField(
+        verbose_name='Дата создания рецепта'
+    )
+
+    objects = FeedEntryManager()
+
+    class Meta:
+        verbose_name = 'Запись ленты'
+        verbose_name_plural = 'Ленты подписок'
+        ordering = ('-created_at', )
+        indexes = [
+            models.Index(
+                fields=['user', '-created_at', '-recipe'],
+                name='feed_user_created_at_idx'
+            )
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'recipe'],
+                name='unique recipe in feed'
+            )
+        ]
+
+    def __str__(self):
+        recipe_name = self.recipe.name
+        username = self.user.username
+        return f'{recipe_name} в ленте у {username}'
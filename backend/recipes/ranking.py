@@ -0,0 +1,51 @@
+import math
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+# Наибольший показатель вклада в периодах полураспада. Вклад события
+# растёт экспоненциально со временем, 2 ** 960 оставляет запас
+# на сумму вкладов до предела float (около 2 ** 1024).
+TRENDING_MAX_HALF_LIVES = 960
+# Когда до предела остаётся меньше стольких периодов, recount
+# предупреждает, что TRENDING_EPOCH пора перенести
+TRENDING_WARNING_HALF_LIVES = 60
+
+
+def trending_half_lives(moment):
+    """Число периодов полураспада от TRENDING_EPOCH до moment."""
+    half_life = settings.TRENDING_HALF_LIFE_DAYS * 24 * 60 * 60
+    seconds = (moment - settings.TRENDING_EPOCH).total_seconds()
+    return seconds / half_life
+
+
+def trending_weight(moment):
+    """Вклад события в trending_score: 2 ** ((t − TRENDING_EPOCH) / T½).
+
+    Затухание к текущему моменту — общий для всех рецептов множитель
+    2 ** (−now / T½), поэтому на порядок сортировки он не влияет
+    и хранимые оценки можно только увеличивать и уменьшать на вклад
+    события. Показатель ограничен TRENDING_MAX_HALF_LIVES: после
+    предела все новые события весят одинаково, пока TRENDING_EPOCH
+    не перенесут и не пересчитают оценки командой recount.
+    """
+    return math.pow(
+        2, min(trending_half_lives(moment), TRENDING_MAX_HALF_LIVES)
+    )
+
+
+def trending_change(moment, sign=1):
+    return Greatest(
+        F('trending_score') + sign * trending_weight(moment), Value(0.0)
+    )
+
+
+def trending_scores(*events):
+    """Суммирует вклады событий (id рецепта, время) по рецептам."""
+    scores = defaultdict(float)
+    for rows in events:
+        for recipe, moment in rows:
+            scores[recipe] += trending_weight(moment)
+    return scores
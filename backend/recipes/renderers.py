@@ -0,0 +1,105 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer
+
+LINES_PER_CHUNK = 500
+
+
+class Echo:
+    """Псевдобуфер для csv.writer: возвращает строку вместо записи."""
+
+    def write(self, value):
+        return value
+
+
+class ShoppingCartRenderer(BaseRenderer):
+    """Базовый рендерер списка покупок.
+
+    Формирует файл построчно из итератора агрегированных ингредиентов,
+    чтобы ответ можно было отдавать через StreamingHttpResponse.
+    Строки файла возвращает метод render_rows наследников.
+    """
+
+    charset = 'utf-8'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Используется только для ответов с ошибками.
+        if data is None:
+            return b''
+        return json.dumps(data, ensure_ascii=False).encode(self.charset)
+
+    def header(self):
+        return ''
+
+    def footer(self):
+        return ''
+
+    def stream(self, ingredients):
+        yield self.header()
+        chunk = []
+        for line in self.render_rows(ingredients):
+            chunk.append(line)
+            if len(chunk) >= LINES_PER_CHUNK:
+                yield ''.join(chunk)
+                chunk = []
+        yield ''.join(chunk) + self.footer()
+
+
+class ShoppingCartTextRenderer(ShoppingCartRenderer):
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def render_rows(self, ingredients):
+        separator = ''
+        for ingredient in ingredients:
+            name = ingredient['ingredient__name']
+            amount = ingredient['total']
+            measurement_unit = ingredient['ingredient__measurement_unit']
+            yield f'{separator}{name} - {amount} {measurement_unit}'
+            separator = ',\n'
+
+
+class ShoppingCartCSVRenderer(ShoppingCartRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def header(self):
+        return csv.writer(Echo()).writerow(
+            ('name', 'amount', 'measurement_unit')
+        )
+
+    def render_rows(self, ingredients):
+        writer = csv.writer(Echo())
+        for ingredient in ingredients:
+            yield writer.writerow((
+                ingredient['ingredient__name'],
+                ingredient['total'],
+                ingredient['ingredient__measurement_unit']
+            ))
+
+
+class ShoppingCartJSONRenderer(ShoppingCartRenderer):
+    media_type = 'application/json'
+    format = 'json'
+
+    def header(self):
+        return '['
+
+    def footer(self):
+        return ']'
+
+    def render_rows(self, ingredients):
+        separator = ''
+        for ingredient in ingredients:
+            yield separator + json.dumps(
+                {
+                    'name': ingredient['ingredient__name'],
+                    'amount': ingredient['total'],
+                    'measurement_unit': (
+                        ingredient['ingredient__measurement_unit']
+                    )
+                },
+                ensure_ascii=False
+            )
+            separator = ','
@@ -0,0 +1,93 @@
+"""Добавление и удаление связей пользователя с RETURNING.
+
+INSERT … ON CONFLICT DO NOTHING не прерывает транзакцию при повторном
+добавлении, поэтому точка сохранения не нужна. RETURNING возвращает
+только строки, которые изменил этот запрос: из одновременных запросов
+счётчики, ленту и список покупок обновляет тот, кому строка вернулась.
+"""
+from django.db import connection
+
+
+def returned_value(field, value):
+    """Значение из RETURNING в том виде, в каком его вернул бы ORM."""
+    expression = field.get_col(field.model._meta.db_table)
+    converters = (
+        connection.ops.get_db_converters(expression)
+        + field.get_db_converters(connection)
+    )
+    for converter in converters:
+        value = converter(value, expression, connection)
+    return value
+
+
+def insert_links(model, owner, owner_id, target, target_ids, values=None,
+                 exclude_owner=False):
+    """Связывает owner_id с существующими объектами target_ids
+    и возвращает id объектов, связи с которыми добавлены.
+
+    Уже существующие связи и несуществующие id пропускаются.
+    values — значения остальных полей новых строк.
+    """
+    target_ids = list(target_ids)
+    if not target_ids:
+        return []
+    quote = connection.ops.quote_name
+    meta = model._meta
+    target_field = meta.get_field(target)
+    target_meta = target_field.related_model._meta
+    target_pk = quote(target_meta.pk.column)
+
+    columns = [meta.get_field(owner).column, target_field.column]
+    selected = ['%s', target_pk]
+    params = [owner_id]
+    for name, value in (values or {}).items():
+        field = meta.get_field(name)
+        columns.append(field.column)
+        selected.append('%s')
+        params.append(field.get_db_prep_value(value, connection))
+    condition = '{pk} IN ({ids})'.format(
+        pk=target_pk, ids=', '.join(['%s'] * len(target_ids))
+    )
+    params += target_ids
+    if exclude_owner:
+        condition += f' AND {target_pk} <> %s'
+        params.append(owner_id)
+
+    # Без WHERE SQLite не отличил бы ON CONFLICT от условия соединения
+    sql = (
+        'INSERT INTO {table} ({columns}) '
+        'SELECT {selected} FROM {source} WHERE {condition} '
+        'ON CONFLICT DO NOTHING RETURNING {target}'
+    ).format(
+        table=quote(meta.db_table),
+        columns=', '.join(quote(column) for column in columns),
+        selected=', '.join(selected),
+        source=quote(target_meta.db_table),
+        condition=condition,
+        target=quote(target_field.column)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        return [row[0] for row in cursor.fetchall()]
+
+
+def delete_link(model, owner, owner_id, target, target_id, returning):
+    """Удаляет связь owner_id с target_id и возвращает значение поля
+    returning удалённой строки или None, если связи не было.
+    """
+    quote = connection.ops.quote_name
+    meta = model._meta
+    field = meta.get_field(returning)
+    sql = (
+        'DELETE FROM {table} WHERE {owner} = %s AND {target} = %s '
+        'RETURNING {returning}'
+    ).format(
+        table=quote(meta.db_table),
+        owner=quote(meta.get_field(owner).column),
+        target=quote(meta.get_field(target).column),
+        returning=quote(field.column)
+    )
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [owner_id, target_id])
+        row = cursor.fetchone()
+    return None if row is None else returned_value(field, row[0])
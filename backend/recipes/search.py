@@ -0,0 +1,85 @@
+from functools import reduce
+from operator import add, and_
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import (SearchQuery, SearchRank,
+                                            SearchVector)
+from django.db import connection
+from django.db.models import (Case, Exists, F, OuterRef, Q, Subquery, Value,
+                              When)
+
+from .models import Recipe, RecipeIngredient
+
+SEARCH_CONFIG = 'russian'
+
+
+def is_postgresql():
+    return connection.vendor == 'postgresql'
+
+
+def search_vector():
+    """Название рецепта весит больше описания, описание — больше
+    названий ингредиентов.
+    """
+    ingredient_names = Subquery(
+        RecipeIngredient.objects.filter(
+            recipe=OuterRef('pk')
+        ).order_by().values('recipe').annotate(
+            names=StringAgg('ingredient__name', ' ')
+        ).values('names')
+    )
+    return (
+        SearchVector('name', weight='A', config=SEARCH_CONFIG)
+        + SearchVector('text', weight='B', config=SEARCH_CONFIG)
+        + SearchVector(ingredient_names, weight='C', config=SEARCH_CONFIG)
+    )
+
+
+def update_search_vectors(pks):
+    if is_postgresql():
+        Recipe.objects.filter(pk__in=pks).update(
+            search_vector=search_vector()
+        )
+
+
+def search_recipes(queryset, value):
+    """Рецепты, найденные по названию, описанию и ингредиентам,
+    отсортированные по релевантности.
+    """
+    ordering = ('-search_rank', *Recipe._meta.ordering)
+
+    if is_postgresql():
+        query = SearchQuery(
+            value, config=SEARCH_CONFIG, search_type='websearch'
+        )
+        return queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        ).order_by(*ordering)
+
+    # Запасной вариант для других СУБД: подстроки и простой ранг
+    terms = value.split()
+    if not terms:
+        return queryset
+    matches = []
+    ranks = []
+    for term in terms:
+        in_ingredients = Exists(
+            RecipeIngredient.objects.filter(
+                recipe=OuterRef('pk'), ingredient__name__icontains=term
+            )
+        )
+        matches.append(
+            Q(name__icontains=term) | Q(text__icontains=term)
+            | Q(in_ingredients)
+        )
+        ranks.extend(
+            Case(When(condition, then=Value(weight)), default=Value(0))
+            for condition, weight in (
+                (Q(name__icontains=term), 3),
+                (Q(text__icontains=term), 2),
+                (Q(in_ingredients), 1),
+            )
+        )
+    return queryset.filter(reduce(and_, matches)).annotate(
+        search_rank=reduce(add, ranks)
+    ).order_by(*ordering)
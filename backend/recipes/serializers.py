@@ -1,24 +1,38 @@
-import base64
-
-from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Prefetch, prefetch_related_objects
 from rest_framework import serializers
 
+from api.fields import Base64ImageField, ThumbnailsField
 from users.serializers import FoodgramUserSerializer
 from .constraints import (
     MIN_COOKING_TIME, MAX_COOKING_TIME,
-    MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT
+    MIN_INGREDIENT_AMOUNT, MAX_INGREDIENT_AMOUNT, MAX_BATCH_SIZE
 )
-from .models import Ingredient, Recipe, RecipeIngredient
+from .models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                     ShoppingListItem)
+
+
+class BatchSerializer(serializers.Serializer):
+    """Список id объектов для пакетной операции."""
 
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=MAX_BATCH_SIZE
+    )
+
+    def validate_ids(self, ids):
+        # Повторы не меняют результат, порядок сохраняем
+        return list(dict.fromkeys(ids))
 
-class Base64RecipeField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='recipe.' + ext)
 
-        return super().to_internal_value(data)
+def batch_results(ids, statuses):
+    return {
+        'results': [
+            {'id': pk, 'status': statuses.get(pk, 'not_found')}
+            for pk in ids
+        ]
+    }
 
 
 class IngredientSerializer(serializers.ModelSerializer):
@@ -28,11 +42,34 @@ class IngredientSerializer(serializers.ModelSerializer):
         read_only_fields = ('id', )
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    """Проверяет ингредиенты рецепта одним запросом к базе
+    вместо запроса на каждый ингредиент.
+    """
+
+    def validate(self, attrs):
+        ids = [item['ingredient']['id'] for item in attrs]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                'Recipe must have unique ingredients'
+            )
+        # Индекс в памяти процесса может отставать от базы, поэтому
+        # существование ингредиентов проверяется запросом
+        ingredients = Ingredient.objects.in_bulk(ids)
+        missing = [pk for pk in ids if pk not in ingredients]
+        if missing:
+            raise serializers.ValidationError(
+                'Ingredients do not exist: '
+                f'{", ".join(str(pk) for pk in missing)}.'
+            )
+        return [
+            {**item, 'ingredient': ingredients[item['ingredient']['id']]}
+            for item in attrs
+        ]
+
+
 class RecipeIngredientSerializer(serializers.ModelSerializer):
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
-        source='ingredient'
-    )
+    id = serializers.IntegerField(source='ingredient.id')
     name = serializers.CharField(
         source='ingredient.name',
         read_only=True
@@ -49,13 +86,15 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeIngredient
         fields = ('id', 'name', 'measurement_unit', 'amount')
+        list_serializer_class = RecipeIngredientListSerializer
 
 
 class RecipeSerializer(serializers.ModelSerializer):
     is_favorited = serializers.SerializerMethodField()
     is_in_shopping_cart = serializers.SerializerMethodField()
     author = FoodgramUserSerializer(read_only=True)
-    image = Base64RecipeField(required=True)
+    image = Base64ImageField(file_name='recipe', required=True)
+    image_thumbnails = ThumbnailsField('image')
     ingredients = RecipeIngredientSerializer(
         source='ingredient_amount',
         many=True
@@ -68,8 +107,9 @@ class RecipeSerializer(serializers.ModelSerializer):
     class Meta:
         model = Recipe
         fields = (
-            'id', 'author', 'name', 'image', 'text', 'cooking_time',
-            'ingredients', 'is_favorited', 'is_in_shopping_cart'
+            'id', 'author', 'name', 'image', 'image_thumbnails', 'text',
+            'cooking_time', 'ingredients', 'is_favorited',
+            'is_in_shopping_cart'
         )
         read_only_fields = ('id', 'author')
 
@@ -96,33 +136,82 @@ class RecipeSerializer(serializers.ModelSerializer):
             setattr(instance, attr, value)
         instance.save()
         if recipe_data is not None:
-            instance.ingredient_amount.all().delete()
-            self.recipe_ingredient_bulk_create(instance, recipe_data)
+            self.recipe_ingredient_apply(instance, recipe_data)
         return instance
 
-    def validate(self, data):
-        ingredients = self.initial_data.get('ingredients')
+    def recipe_ingredient_apply(self, instance, recipe_data):
+        """Приводит ингредиенты рецепта к recipe_data: меняет только
+        изменившиеся количества, добавляет новые и удаляет убранные.
+        """
+        current = {
+            ingredient: (pk, amount)
+            for pk, ingredient, amount in RecipeIngredient.objects.filter(
+                recipe=instance
+            ).values_list('pk', 'ingredient', 'amount')
+        }
+        amounts = {
+            recipe_ingredient['ingredient'].id: recipe_ingredient['amount']
+            for recipe_ingredient in recipe_data
+        }
+        changed = []
+        added = []
+        # Изменения сумм в списках покупок по ингредиентам
+        deltas = {}
+        for ingredient, amount in amounts.items():
+            if ingredient not in current:
+                added.append(RecipeIngredient(
+                    recipe=instance, ingredient_id=ingredient, amount=amount
+                ))
+                deltas[ingredient] = amount
+                continue
+            pk, old_amount = current[ingredient]
+            if old_amount != amount:
+                changed.append(RecipeIngredient(pk=pk, amount=amount))
+                deltas[ingredient] = amount - old_amount
+        removed = []
+        for ingredient, (pk, amount) in current.items():
+            if ingredient not in amounts:
+                removed.append(pk)
+                deltas[ingredient] = -amount
+
+        with transaction.atomic():
+            if removed:
+                RecipeIngredient.objects.filter(pk__in=removed).delete()
+            if changed:
+                RecipeIngredient.objects.bulk_update(changed, ['amount'])
+            if added:
+                RecipeIngredient.objects.bulk_create(added)
+            if deltas:
+                ShoppingListItem.objects.change_totals(
+                    ShoppingCart.objects.filter(
+                        recipe=instance
+                    ).values_list('user', flat=True),
+                    deltas
+                )
 
-        if not ingredients:
+    def validate(self, data):
+        if not data.get('ingredient_amount'):
             raise serializers.ValidationError(
                 'Recipe must have at least 1 ingredient'
             )
-
-        ingredients_set = set(key['id'] for key in ingredients)
-
-        if len(ingredients) != len(ingredients_set):
-            raise serializers.ValidationError(
-                'Recipe must have unique ingredients'
-            )
-
         return data
 
     def to_representation(self, instance):
+        if hasattr(instance, 'author_is_subscribed'):
+            instance.author.is_subscribed = instance.author_is_subscribed
+        # После создания и изменения рецепта ингредиенты не загружены,
+        # читаем их одним запросом вместо запроса на каждый
+        prefetch_related_objects([instance], Prefetch(
+            'ingredient_amount',
+            queryset=RecipeIngredient.objects.select_related('ingredient')
+        ))
         representation = super().to_representation(instance)
         representation['image'] = instance.image.url
         return representation
 
     def get_is_favorited(self, obj):
+        if hasattr(obj, 'is_favorited'):
+            return obj.is_favorited
         user = self.context['request'].user
         return obj.favorited_recipes.filter(user=user.id).exists()
         # return Favorite.objects.filter(
@@ -131,6 +220,8 @@ class RecipeSerializer(serializers.ModelSerializer):
         # ).exists()
 
     def get_is_in_shopping_cart(self, obj):
+        if hasattr(obj, 'is_in_shopping_cart'):
+            return obj.is_in_shopping_cart
         user = self.context['request'].user
         return obj.recipes_in_shopping_cart.filter(user=user.id).exists()
         # return ShoppingCart.objects.filter(
@@ -0,0 +1,51 @@
+import string
+from functools import lru_cache
+
+from django.http import Http404, HttpResponseRedirect
+
+from .models import Recipe
+
+ALPHABET = string.digits + string.ascii_letters
+BASE = len(ALPHABET)
+INDEX = {character: position for position, character in enumerate(ALPHABET)}
+# Длина кода ограничена, чтобы не декодировать заведомо чужие строки
+MAX_CODE_LENGTH = 11
+RECIPE_PATH = '/recipes/{pk}'
+
+
+def encode(number):
+    code = ''
+    while True:
+        number, remainder = divmod(number, BASE)
+        code = ALPHABET[remainder] + code
+        if not number:
+            return code
+
+
+def decode(code):
+    if not code or len(code) > MAX_CODE_LENGTH:
+        raise ValueError(code)
+    number = 0
+    for character in code:
+        number = number * BASE + INDEX[character]
+    return number
+
+
+@lru_cache(maxsize=65536)
+def recipe_path(pk):
+    """Путь страницы рецепта на фронтенде.
+
+    Существование рецепта проверяется запросом без создания объектов
+    модели. Исключения lru_cache не кеширует, поэтому код рецепта,
+    который появится позже, не «залипнет» как несуществующий.
+    """
+    if not Recipe.objects.filter(pk=pk).exists():
+        raise Recipe.DoesNotExist
+    return RECIPE_PATH.format(pk=pk)
+
+
+def short_link_redirect(request, code):
+    try:
+        return HttpResponseRedirect(recipe_path(decode(code)))
+    except (KeyError, ValueError, Recipe.DoesNotExist):
+        raise Http404
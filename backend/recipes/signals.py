@@ -0,0 +1,283 @@
+import threading
+import weakref
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.core.signals import setting_changed
+from django.db.models import QuerySet
+from django.db.models.signals import (post_delete, post_save, pre_delete,
+                                      pre_save)
+from django.dispatch import receiver
+
+from .cache import invalidate_recipes
+from .images import (AVATAR_WIDTHS, RECIPE_IMAGE_WIDTHS, get_backend,
+                     release_image, schedule_thumbnails, thumbnails_field,
+                     thumbnails_ready)
+from .ingredient_index import bump_catalog_version, ingredient_index
+from .ingredient_sets import update_ingredient_ids
+from .models import (Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                     ShoppingListItem)
+from .search import update_search_vectors
+from .shortlinks import recipe_path
+
+AUTHOR_FIELDS = {'email', 'username', 'first_name', 'last_name', 'avatar'}
+IMAGE_FIELDS = {
+    Recipe: ('image', RECIPE_IMAGE_WIDTHS),
+    get_user_model(): ('avatar', AVATAR_WIDTHS),
+}
+
+
+def invalidate_ingredient_catalog():
+    bump_catalog_version()
+    ingredient_index.invalidate()
+
+
+def invalidate_recipes_on_commit(pks):
+    # Кеш сбрасываем после коммита, иначе другой процесс
+    # может закешировать ещё не сохранённые данные.
+    transaction.on_commit(partial(invalidate_recipes, list(pks)))
+
+
+def recipes_changed(pks):
+    update_search_vectors(pks)
+    update_ingredient_ids(pks)
+    invalidate_recipes(pks)
+
+
+# Ожидающий пересчёт рецептов для каждого соединения потока.
+# Задачу держит только очередь on_commit соединения, здесь лежит
+# слабая ссылка: при откате Django очищает очередь и ссылка
+# обнуляется, при коммите задача удаляет её сама.
+pending_recalculations = threading.local()
+
+
+class RecipesChangedCallback:
+    """Пересчёт рецептов после коммита, один на транзакцию.
+
+    Сигналы приходят на каждую удалённую или изменённую строку
+    RecipeIngredient, id рецептов из них собираются в одну задачу.
+    """
+
+    def __init__(self, using):
+        self.using = using
+        self.pks = set()
+
+    def __call__(self):
+        pending_recalculations.__dict__.pop(self.using, None)
+        recipes_changed(sorted(self.pks))
+
+
+def recipes_changed_on_commit(pks, using=None):
+    # Денормализованные поля пересчитываем после коммита: к этому
+    # моменту ингредиенты рецепта, созданные через bulk_create,
+    # уже сохранены.
+    pks = set(pks)
+    if not pks:
+        return
+    using = transaction.get_connection(using).alias
+    reference = getattr(pending_recalculations, using, None)
+    callback = reference() if reference else None
+    if callback is not None:
+        callback.pks |= pks
+        return
+    callback = RecipesChangedCallback(using)
+    callback.pks |= pks
+    setattr(pending_recalculations, using, weakref.ref(callback))
+    transaction.on_commit(callback, using=using)
+
+
+@receiver(post_save, sender=Ingredient)
+@receiver(post_delete, sender=Ingredient)
+def ingredient_changed(sender, instance, **kwargs):
+    transaction.on_commit(invalidate_ingredient_catalog)
+    recipes_changed_on_commit(
+        RecipeIngredient.objects.filter(
+            ingredient=instance
+        ).values_list('recipe', flat=True)
+    )
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_delete, sender=Recipe)
+def recipe_changed(sender, instance, **kwargs):
+    recipes_changed_on_commit([instance.pk])
+
+
+@receiver(thumbnails_ready, sender=Recipe)
+def recipe_thumbnails_ready(sender, pk, **kwargs):
+    invalidate_recipes([pk])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    # Кеш коротких ссылок у каждого процесса свой, в остальных
+    # процессах ссылка на удалённый рецепт ведёт на страницу 404
+    transaction.on_commit(recipe_path.cache_clear)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+@receiver(post_delete, sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    recipes_changed_on_commit([instance.recipe_id])
+
+
+def cart_users(recipe):
+    return ShoppingCart.objects.filter(
+        recipe=recipe
+    ).values_list('user', flat=True)
+
+
+def deleted_directly(sender, origin):
+    """Удаление начато с самих строк sender, а не каскадом."""
+    if isinstance(origin, QuerySet):
+        return origin.model is sender
+    return isinstance(origin, sender)
+
+
+@receiver(pre_save, sender=ShoppingCart)
+def remember_cart(sender, instance, **kwargs):
+    instance._previous_cart = None
+    if not instance._state.adding:
+        instance._previous_cart = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('user', 'recipe').first()
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_saved(sender, instance, raw, **kwargs):
+    # Представления добавляют и удаляют строки корзины запросами
+    # с RETURNING и меняют списки покупок сами, сюда приходят
+    # изменения через ORM: админка, shell, фикстуры.
+    previous = instance.__dict__.pop('_previous_cart', None)
+    if raw or previous == (instance.user_id, instance.recipe_id):
+        return
+    if previous:
+        ShoppingListItem.objects.remove_recipe([previous[0]], previous[1])
+    ShoppingListItem.objects.add_recipe(
+        [instance.user_id], instance.recipe_id
+    )
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_deleted(sender, instance, origin, **kwargs):
+    # При удалении рецепта суммы уменьшает recipe_removed, строки
+    # списка удалённого пользователя удаляются каскадом вместе с ним
+    if deleted_directly(sender, origin):
+        ShoppingListItem.objects.remove_recipe(
+            [instance.user_id], instance.recipe_id
+        )
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    # До удаления, пока ингредиенты рецепта и корзины ещё в базе
+    ShoppingListItem.objects.remove_recipe(cart_users(instance), instance)
+
+
+@receiver(pre_save, sender=RecipeIngredient)
+def remember_amount(sender, instance, **kwargs):
+    instance._previous_amount = None
+    if not instance._state.adding:
+        instance._previous_amount = sender.objects.filter(
+            pk=instance.pk
+        ).values_list('recipe', 'ingredient', 'amount').first()
+
+
+def change_recipe_totals(*changes):
+    """Применяет изменения (рецепт, ингредиент, количество)
+    к спискам покупок пользователей, у которых рецепт в корзине.
+    """
+    deltas = {}
+    for recipe, ingredient, amount in changes:
+        recipe_deltas = deltas.setdefault(recipe, {})
+        recipe_deltas[ingredient] = recipe_deltas.get(ingredient, 0) + amount
+    for recipe, amounts in deltas.items():
+        ShoppingListItem.objects.change_totals(cart_users(recipe), amounts)
+
+
+@receiver(post_save, sender=RecipeIngredient)
+def amount_saved(sender, instance, raw, **kwargs):
+    previous = instance.__dict__.pop('_previous_amount', None)
+    if raw:
+        return
+    changes = [(instance.recipe_id, instance.ingredient_id, instance.amount)]
+    if previous:
+        recipe, ingredient, amount = previous
+        changes.append((recipe, ingredient, -amount))
+    change_recipe_totals(*changes)
+
+
+@receiver(post_delete, sender=RecipeIngredient)
+def amount_deleted(sender, instance, origin, **kwargs):
+    # RecipeSerializer удаляет строки запросом и учитывает их
+    # в своей разнице, админка удаляет строки по одной
+    if isinstance(origin, RecipeIngredient):
+        change_recipe_totals(
+            (instance.recipe_id, instance.ingredient_id, -instance.amount)
+        )
+
+
+@receiver(post_save, sender=get_user_model())
+def author_changed(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    invalidate_recipes_on_commit(
+        instance.recipes.values_list('pk', flat=True)
+    )
+
+
+@receiver(pre_save, sender=Recipe)
+@receiver(pre_save, sender=get_user_model())
+def remember_image(sender, instance, update_fields, **kwargs):
+    field_name, _ = IMAGE_FIELDS[sender]
+    instance._previous_image = None
+    if instance._state.adding or (
+        update_fields is not None and field_name not in update_fields
+    ):
+        return
+    instance._previous_image = sender.objects.filter(
+        pk=instance.pk
+    ).values_list(field_name, thumbnails_field(field_name)).first()
+
+
+@receiver(post_save, sender=Recipe)
+@receiver(post_save, sender=get_user_model())
+def image_saved(sender, instance, **kwargs):
+    field_name, widths = IMAGE_FIELDS[sender]
+    image = getattr(instance, field_name)
+    previous = instance.__dict__.pop('_previous_image', None)
+    if previous and previous[0] != image.name:
+        # Файл удаляется после коммита, если на него больше
+        # никто не ссылается
+        transaction.on_commit(
+            partial(release_image, image.storage, *previous)
+        )
+    schedule_thumbnails(instance, field_name, widths)
+
+
+@receiver(post_delete, sender=Recipe)
+@receiver(post_delete, sender=get_user_model())
+def image_deleted(sender, instance, **kwargs):
+    field_name, _ = IMAGE_FIELDS[sender]
+    image = getattr(instance, field_name)
+    transaction.on_commit(partial(
+        release_image, image.storage, image.name,
+        getattr(instance, thumbnails_field(field_name))
+    ))
+
+
+@receiver(thumbnails_ready, sender=get_user_model())
+def avatar_thumbnails_ready(sender, pk, **kwargs):
+    invalidate_recipes(
+        Recipe.objects.filter(author=pk).values_list('pk', flat=True)
+    )
+
+
+@receiver(setting_changed)
+def image_backend_changed(setting, **kwargs):
+    # Очередь обработки изображений создаётся один раз на процесс
+    if setting == 'IMAGE_TASK_BACKEND':
+        get_backend.cache_clear()
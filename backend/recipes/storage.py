@@ -0,0 +1,99 @@
+import hashlib
+import posixpath
+import re
+from contextlib import contextmanager
+
+from django.apps import apps
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+from django.db import connection, transaction
+from django.db.models import FileField
+
+HASHED_NAME_RE = re.compile(r'^[0-9a-f]{64}$')
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Хранилище, в котором имя файла — SHA-256 его содержимого.
+
+    Одинаковые загрузки сохраняются в один файл. Файл удаляется,
+    только когда на него больше не ссылается ни одно поле моделей,
+    использующее это хранилище.
+
+    Повторное использование существующего файла при сохранении
+    и удаление файла выполняются под блокировкой имени (locked),
+    иначе файл можно удалить между проверкой при сохранении
+    и коммитом записи, которая на него ссылается.
+    """
+
+    def hashed_name(self, name, content):
+        hasher = hashlib.sha256()
+        for chunk in content.chunks():
+            hasher.update(chunk)
+        content.seek(0)
+        directory, filename = posixpath.split(name)
+        extension = posixpath.splitext(filename)[1].lower()
+        return posixpath.join(directory, hasher.hexdigest() + extension)
+
+    def is_hashed(self, name):
+        stem = posixpath.splitext(posixpath.basename(name))[0]
+        return bool(HASHED_NAME_RE.match(stem))
+
+    @contextmanager
+    def locked(self, name):
+        """Блокировка имени файла до конца текущей транзакции.
+
+        В PostgreSQL это advisory-блокировка по хешу имени, в SQLite
+        транзакции и так выполняются по одной (BEGIN IMMEDIATE).
+        Сохранение файла нужно вызывать внутри transaction.atomic
+        вместе с записью, которая на него ссылается.
+        """
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                key = int.from_bytes(
+                    hashlib.sha256(name.encode()).digest()[:8],
+                    'big',
+                    signed=True
+                )
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT pg_advisory_xact_lock(%s)', [key])
+            yield
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.hashed_name(name, content)
+        with self.locked(name):
+            if not self.exists(name):
+                name = super().save(name, content, max_length)
+        if hasattr(content, 'temporary_file_path'):
+            # Временный файл загрузки уже перемещён или не нужен,
+            # закрываем его сразу, а не при сборке мусора
+            content.close()
+        return name
+
+    def reference_fields(self):
+        for model in apps.get_models():
+            for field in model._meta.get_fields():
+                if (
+                    isinstance(field, FileField)
+                    and isinstance(field.storage, ContentAddressedStorage)
+                ):
+                    yield model, field.name
+
+    def is_referenced(self, name):
+        return any(
+            model._default_manager.filter(**{field_name: name}).exists()
+            for model, field_name in self.reference_fields()
+        )
+
+    def delete(self, name):
+        if not name:
+            return
+        with self.locked(name):
+            if not self.is_referenced(name):
+                super().delete(name)
+
+
+image_storage = ContentAddressedStorage()
@@ -0,0 +1,75 @@
+from django.contrib.auth import get_user_model
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe, ShoppingCart, ShoppingListItem
+from users.models import Subscription
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class BatchTest(MediaMixin, APITestCase):
+    """Пакетные операции меняют счётчики только для добавленных
+    объектов и возвращают статус каждого id.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.author = create_user('author')
+        cls.other = create_user('other')
+        cls.ingredients = create_ingredients(2)
+        cls.recipes = [
+            create_recipe(cls.author, cls.ingredients, name=f'Рецепт {n}')
+            for n in range(3)
+        ]
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+
+    def statuses(self, url, ids):
+        response = self.client.post(url, {'ids': ids}, format='json')
+        self.assertEqual(response.status_code, 200)
+        return [result['status'] for result in response.data['results']]
+
+    def test_recipes_batch(self):
+        first, second, third = self.recipes
+        for model, url, counter in (
+            (Favorite, '/api/recipes/favorite/', 'favorites_count'),
+            (ShoppingCart, '/api/recipes/shopping_cart/', 'carts_count'),
+        ):
+            with self.subTest(model=model.__name__):
+                model.objects.create(user=self.user, recipe=first)
+                self.assertEqual(
+                    self.statuses(
+                        url, [first.id, second.id, 999, third.id, second.id]
+                    ),
+                    ['exists', 'created', 'not_found', 'created']
+                )
+                self.assertEqual(
+                    dict(Recipe.objects.values_list('pk', counter)),
+                    {first.id: 0, second.id: 1, third.id: 1}
+                )
+                self.assertEqual(model.objects.count(), 3)
+
+        self.assertEqual(
+            dict(ShoppingListItem.objects.filter(
+                user=self.user
+            ).values_list('ingredient', 'total')),
+            {ingredient.id: 30 for ingredient in self.ingredients}
+        )
+
+    def test_subscribe_batch(self):
+        Subscription.objects.create(user=self.other, follower=self.user)
+        self.assertEqual(
+            self.statuses(
+                '/api/users/subscriptions/',
+                [self.user.id, self.other.id, self.author.id, 999]
+            ),
+            ['invalid', 'exists', 'created', 'not_found']
+        )
+        self.assertEqual(
+            get_user_model().objects.get(pk=self.author.id).followers_count,
+            1
+        )
+        self.assertEqual(self.user.feed.count(), len(self.recipes))
@@ -0,0 +1,105 @@
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APITransactionTestCase
+
+from recipes.models import Favorite, Ingredient
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class AnonymousResponseCacheTest(MediaMixin, APITransactionTestCase):
+    """Ответы анонимным пользователям отдаются из кеша, пока рецепты
+    и их ингредиенты не изменились. Авторизованные запросы кеш
+    не используют.
+
+    Версии кеша сбрасываются после коммита, поэтому изменения
+    в тестах действительно фиксируются.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.ingredients = create_ingredients(2)
+        self.recipe = create_recipe(self.author, self.ingredients)
+
+    def get(self, url='/api/recipes/'):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response.data, len(queries)
+
+    def names(self):
+        data, _ = self.get()
+        return [recipe['name'] for recipe in data['results']]
+
+    def ingredient_names(self):
+        data, _ = self.get()
+        return sorted(
+            ingredient['name']
+            for ingredient in data['results'][0]['ingredients']
+        )
+
+    def test_anonymous_responses_are_cached(self):
+        for url in ('/api/recipes/', f'/api/recipes/{self.recipe.id}/'):
+            with self.subTest(url=url):
+                data, queries = self.get(url)
+                self.assertTrue(queries)
+                cached, queries = self.get(url)
+                self.assertEqual(queries, 0)
+                self.assertEqual(cached, data)
+
+    def test_recipe_changes_invalidate(self):
+        self.assertEqual(self.names(), ['Рецепт'])
+
+        created = create_recipe(self.author, self.ingredients, name='Новый')
+        self.assertEqual(self.names(), ['Новый', 'Рецепт'])
+
+        created.name = 'Изменённый'
+        created.save()
+        self.assertEqual(self.names(), ['Изменённый', 'Рецепт'])
+        data, _ = self.get(f'/api/recipes/{created.id}/')
+        self.assertEqual(data['name'], 'Изменённый')
+
+        created.delete()
+        self.assertEqual(self.names(), ['Рецепт'])
+
+    def test_ingredient_changes_invalidate(self):
+        first, second = self.ingredients
+        self.assertEqual(
+            self.ingredient_names(), [first.name, second.name]
+        )
+
+        salt = Ingredient.objects.create(name='соль', measurement_unit='г')
+        create_recipe(self.author, [salt], name='Солёный')
+        self.assertEqual(self.ingredient_names(), ['соль'])
+
+        first.name = 'перец'
+        first.save()
+        data, _ = self.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(
+            sorted(ingredient['name'] for ingredient in data['ingredients']),
+            sorted(['перец', second.name])
+        )
+
+        second.delete()
+        data, _ = self.get(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(
+            [ingredient['name'] for ingredient in data['ingredients']],
+            ['перец']
+        )
+
+    def test_authenticated_requests_bypass_cache(self):
+        self.get()
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+
+        self.client.force_authenticate(self.user)
+        for _ in range(2):
+            data, queries = self.get()
+            self.assertTrue(queries)
+            self.assertTrue(data['results'][0]['is_favorited'])
+
+        self.client.force_authenticate(None)
+        data, queries = self.get()
+        self.assertEqual(queries, 0)
+        self.assertFalse(data['results'][0]['is_favorited'])
@@ -0,0 +1,109 @@
+import threading
+
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import TransactionTestCase
+from rest_framework.test import APIClient
+
+from recipes.models import Recipe, ShoppingListItem
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+THREADS = 4
+
+
+class ConcurrentToggleTest(MediaMixin, TransactionTestCase):
+    """Из одновременных одинаковых запросов на добавление и удаление
+    успешен только один, счётчики меняются ровно один раз.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.user = create_user('reader')
+        self.author = create_user('author')
+        self.ingredients = create_ingredients(2)
+        self.recipe = create_recipe(self.author, self.ingredients)
+
+    def parallel(self, method, url):
+        """Отправляет запрос из THREADS потоков одновременно
+        и возвращает отсортированные коды ответов.
+        """
+        barrier = threading.Barrier(THREADS)
+        codes = []
+
+        def send():
+            client = APIClient()
+            client.force_authenticate(self.user)
+            try:
+                barrier.wait()
+                codes.append(getattr(client, method)(url).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=send) for _ in range(THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return sorted(codes)
+
+    def assert_toggled(self, url, added, removed):
+        self.assertEqual(
+            self.parallel('post', url), [201] + [400] * (THREADS - 1)
+        )
+        added()
+        self.assertEqual(
+            self.parallel('delete', url), [204] + [400] * (THREADS - 1)
+        )
+        removed()
+
+    def assert_recipe_counter(self, counter, value):
+        self.assertEqual(
+            getattr(Recipe.objects.get(pk=self.recipe.pk), counter), value
+        )
+
+    def test_favorite(self):
+        self.assert_toggled(
+            f'/api/recipes/{self.recipe.id}/favorite/',
+            lambda: self.assert_recipe_counter('favorites_count', 1),
+            lambda: self.assert_recipe_counter('favorites_count', 0)
+        )
+
+    def test_shopping_cart(self):
+        def totals():
+            return dict(
+                ShoppingListItem.objects.filter(
+                    user=self.user, total__gt=0
+                ).values_list('ingredient', 'total')
+            )
+
+        def added():
+            self.assert_recipe_counter('carts_count', 1)
+            self.assertEqual(
+                totals(),
+                {ingredient.id: 10 for ingredient in self.ingredients}
+            )
+
+        def removed():
+            self.assert_recipe_counter('carts_count', 0)
+            self.assertEqual(totals(), {})
+
+        self.assert_toggled(
+            f'/api/recipes/{self.recipe.id}/shopping_cart/', added, removed
+        )
+
+    def test_subscribe(self):
+        def assert_followers(value, feed):
+            self.assertEqual(
+                get_user_model().objects.get(
+                    pk=self.author.pk
+                ).followers_count,
+                value
+            )
+            self.assertEqual(self.user.feed.count(), feed)
+
+        self.assert_toggled(
+            f'/api/users/{self.author.id}/subscribe/',
+            lambda: assert_followers(1, 1),
+            lambda: assert_followers(0, 0)
+        )
@@ -0,0 +1,72 @@
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import FeedEntry
+
+from .utils import MediaMixin, create_ingredients, create_user, image_data_uri
+
+
+@override_settings(FEED_FANOUT_MAX_FOLLOWERS=1)
+class FeedThresholdTest(MediaMixin, APITestCase):
+    """Рецепты автора остаются в ленте, когда число его подписчиков
+    переходит через FEED_FANOUT_MAX_FOLLOWERS в любую сторону.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.readers = [create_user(f'reader{number}') for number in range(2)]
+        cls.ingredients = create_ingredients(1)
+
+    def as_user(self, user):
+        self.client.force_authenticate(user)
+        return self.client
+
+    def subscribe(self, reader, method='post'):
+        response = getattr(self.as_user(reader), method)(
+            f'/api/users/{self.author.id}/subscribe/'
+        )
+        self.assertIn(response.status_code, (201, 204))
+
+    def publish(self, name):
+        # В запросе автор должен быть с текущим числом подписчиков
+        self.author.refresh_from_db()
+        response = self.as_user(self.author).post(
+            '/api/recipes/',
+            {
+                'name': name,
+                'text': 'Описание',
+                'cooking_time': 30,
+                'image': image_data_uri(),
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 10}
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def feed(self, reader):
+        response = self.as_user(reader).get('/api/recipes/feed/')
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_author_drops_below_threshold(self):
+        first, second = self.readers
+        self.subscribe(first)
+        pushed = self.publish('Разослан')
+        self.subscribe(second)
+        # Подписчиков больше порога: рецепт читается при запросе ленты
+        pulled = self.publish('Прочитан')
+        self.assertFalse(FeedEntry.objects.filter(recipe=pulled).exists())
+        self.assertEqual(self.feed(first), [pulled, pushed])
+        self.assertEqual(self.feed(second), [pulled, pushed])
+
+        self.subscribe(second, 'delete')
+        self.assertEqual(self.feed(first), [pulled, pushed])
+        self.assertEqual(self.feed(second), [])
+
+        self.subscribe(second)
+        self.assertEqual(self.feed(first), [pulled, pushed])
+        self.assertEqual(self.feed(second), [pulled, pushed])
@@ -0,0 +1,142 @@
+import base64
+
+from django.core.files.storage import default_storage
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.blurhash import CHARACTERS
+from recipes.images import thumbnail_name
+from recipes.models import Recipe
+
+from .utils import MediaMixin, create_ingredients, create_user, image_data_uri
+
+COLOR = (200, 120, 40)
+
+
+def base83_decode(value):
+    result = 0
+    for character in value:
+        result = result * 83 + CHARACTERS.index(character)
+    return result
+
+
+class RecipeImageTest(MediaMixin, APITestCase):
+    """Загрузка изображений через API: миниатюры, blurhash-заглушка
+    и проверки data URI.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(1)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def create(self, image):
+        return self.client.post(
+            '/api/recipes/',
+            {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 30,
+                'image': image,
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 10}
+                ],
+            },
+            format='json'
+        )
+
+    def test_thumbnails(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create(image_data_uri(COLOR, size=(700, 350)))
+        self.assertEqual(response.status_code, 201)
+
+        response = self.client.get(f'/api/recipes/{response.data["id"]}/')
+        thumbnails = response.data['image_thumbnails']
+        # Изображения не увеличиваются, поэтому ширины 1280 нет
+        self.assertEqual(
+            [(size['width'], size['height']) for size in thumbnails['sizes']],
+            [(320, 160), (640, 320)]
+        )
+        source = Recipe.objects.get().image.name
+        for size in thumbnails['sizes']:
+            for extension in ('webp', 'jpeg'):
+                name = thumbnail_name(source, size['width'], extension)
+                self.assertTrue(default_storage.exists(name))
+                self.assertEqual(size[extension], default_storage.url(name))
+
+    def test_blurhash(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.create(image_data_uri(COLOR, size=(64, 48)))
+        blurhash = self.client.get(
+            f'/api/recipes/{response.data["id"]}/'
+        ).data['image_thumbnails']['blurhash']
+        # 4 × 3 компонента: размер, максимум, цвет и 11 пар символов
+        self.assertEqual(len(blurhash), 28)
+        self.assertEqual(base83_decode(blurhash[0]), 3 + 2 * 9)
+        color = base83_decode(blurhash[2:6])
+        self.assertEqual(
+            (color >> 16, color >> 8 & 255, color & 255), COLOR
+        )
+
+    def test_thumbnails_pending(self):
+        # Миниатюры строятся после коммита, до этого поле пустое
+        response = self.create(image_data_uri(COLOR))
+        self.assertEqual(response.status_code, 201)
+        self.assertIsNone(response.data['image_thumbnails'])
+
+    @override_settings(IMAGE_UPLOAD_MAX_SIZE=100)
+    def test_too_large(self):
+        response = self.create(image_data_uri(size=(200, 200)))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            response.data['image'], ['Image is larger than 100 bytes.']
+        )
+
+    def test_rejected_data(self):
+        gif = base64.b64encode(b'GIF89a' + bytes(30)).decode()
+        for image, message in (
+            (
+                f'data:image/png;base64,{gif}',
+                'Image data does not match image/png.'
+            ),
+            (
+                f'data:image/svg+xml;base64,{gif}',
+                'Unsupported image type: image/svg+xml.'
+            ),
+            ('data:image/png;base64,abc', 'Invalid base64 image data.'),
+        ):
+            with self.subTest(message=message):
+                response = self.create(image)
+                self.assertEqual(response.status_code, 400)
+                self.assertEqual(response.data['image'], [message])
+        self.assertFalse(Recipe.objects.exists())
+
+
+class AvatarImageTest(MediaMixin, APITestCase):
+    """Миниатюры аватара строятся так же, как у рецептов."""
+
+    def test_avatar_thumbnails(self):
+        user = create_user('reader')
+        self.client.force_authenticate(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.put(
+                '/api/users/me/avatar/',
+                {'avatar': image_data_uri(COLOR, size=(100, 100))},
+                format='json'
+            )
+        self.assertEqual(response.status_code, 200)
+
+        # /users/me/ отдаёт request.user, перечитываем его из базы
+        user.refresh_from_db()
+        self.client.force_authenticate(user)
+        thumbnails = self.client.get('/api/users/me/').data[
+            'avatar_thumbnails'
+        ]
+        self.assertEqual(
+            [size['width'] for size in thumbnails['sizes']], [64]
+        )
+        self.assertEqual(len(thumbnails['blurhash']), 28)
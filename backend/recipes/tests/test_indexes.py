@@ -0,0 +1,111 @@
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+
+from recipes.models import Ingredient, Recipe, ShoppingCart
+from users.models import Subscription
+
+from .utils import (MediaMixin, create_ingredients, create_recipe,
+                    create_user)
+
+
+class ExplainTestCase(TestCase):
+
+    def explain(self, queryset):
+        with connection.cursor() as cursor:
+            # На маленькой таблице планировщик выбрал бы полный просмотр
+            cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Индексы триграмм есть только в PostgreSQL'
+)
+class TrigramIndexTest(ExplainTestCase):
+    """Поиск по началу и по части названия использует индексы триграмм.
+
+    Фильтры istartswith и icontains сравнивают UPPER(name), поэтому
+    индексы построены по тому же выражению.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        create_ingredients(50, prefix='молоко')
+
+    def test_ingredient_name_index(self):
+        for lookup in ('name__istartswith', 'name__icontains'):
+            with self.subTest(lookup=lookup):
+                self.assertIn(
+                    'ingredient_name_trgm_idx',
+                    self.explain(Ingredient.objects.filter(**{lookup: 'мол'}))
+                )
+
+    def test_recipe_name_index(self):
+        for lookup in ('name__istartswith', 'name__icontains'):
+            with self.subTest(lookup=lookup):
+                self.assertIn(
+                    'recipe_name_trgm_idx',
+                    self.explain(Recipe.objects.filter(**{lookup: 'пирог'}))
+                )
+
+
+@skipUnless(
+    connection.vendor == 'postgresql',
+    'Планы запросов проверяются только в PostgreSQL'
+)
+class OrderedIndexTest(MediaMixin, ExplainTestCase):
+    """Выборки пользователя или автора, упорядоченные по второму
+    полю индекса, читают составной индекс без сортировки.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        ingredients = create_ingredients(1)
+        cls.users = [create_user(f'user{number}') for number in range(5)]
+        for author in cls.users:
+            for number in range(5):
+                recipe = create_recipe(
+                    author, ingredients, name=f'Рецепт {number}'
+                )
+                ShoppingCart.objects.bulk_create([
+                    ShoppingCart(user=user, recipe=recipe)
+                    for user in cls.users
+                ])
+            Subscription.objects.bulk_create([
+                Subscription(user=user, follower=author)
+                for user in cls.users if user != author
+            ])
+
+    def test_recipe_author_created_at_index(self):
+        self.assertIn(
+            'recipe_author_created_at_idx',
+            self.explain(
+                Recipe.objects.filter(
+                    author=self.users[0]
+                ).order_by('-created_at')[:10]
+            )
+        )
+
+    def test_cart_user_created_at_index(self):
+        self.assertIn(
+            'cart_user_created_at_idx',
+            self.explain(
+                ShoppingCart.objects.filter(
+                    user=self.users[0]
+                ).order_by('-created_at')[:10]
+            )
+        )
+
+    def test_subscription_follower_user_index(self):
+        # Подписки пользователя: уникальное ограничение начинается
+        # с user и поиск по follower не обслуживает
+        self.assertIn(
+            'subscription_follower_user_idx',
+            self.explain(
+                Subscription.objects.filter(
+                    follower=self.users[0]
+                ).order_by('user')[:10]
+            )
+        )
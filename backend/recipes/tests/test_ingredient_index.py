@@ -0,0 +1,87 @@
+import time
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase
+
+from recipes.ingredient_index import ingredient_index
+from recipes.models import Ingredient
+
+
+def after_ttl():
+    """Время, когда версия каталога в кеше процесса уже истекла."""
+    return mock.patch(
+        'time.time',
+        return_value=time.time() + settings.INGREDIENT_CATALOG_TTL + 1
+    )
+
+
+class CatalogTestCase(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        ingredient_index.invalidate()
+
+
+class IngredientIndexTest(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.apricot = Ingredient.objects.create(
+            name='абрикос', measurement_unit='г'
+        )
+        Ingredient.objects.create(name='банан', measurement_unit='шт')
+
+    def rename_in_other_process(self, name):
+        # UPDATE без сигналов: версию каталога меняет только
+        # кеш другого процесса
+        Ingredient.objects.filter(pk=self.apricot.pk).update(name=name)
+
+    def test_search_refreshes_after_version_ttl(self):
+        self.assertEqual(
+            [row['name'] for row in ingredient_index.search(['аб'])],
+            ['абрикос']
+        )
+        self.rename_in_other_process('айва')
+        with after_ttl():
+            self.assertEqual(ingredient_index.search(['аб']), [])
+            self.assertEqual(
+                [row['name'] for row in ingredient_index.search(['ай'])],
+                ['айва']
+            )
+
+    def test_local_change_refreshes_immediately(self):
+        ingredient_index.search(['аб'])
+        self.apricot.name = 'айва'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.apricot.save()
+        self.assertEqual(ingredient_index.search(['аб']), [])
+
+
+class IngredientCatalogTest(CatalogTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.apricot = Ingredient.objects.create(
+            name='абрикос', measurement_unit='г'
+        )
+
+    def test_etag_changes_after_version_ttl(self):
+        response = self.client.get('/api/ingredients/')
+        etag = response['ETag']
+        self.assertEqual(
+            self.client.get(
+                '/api/ingredients/', HTTP_IF_NONE_MATCH=etag
+            ).status_code,
+            304
+        )
+        # Каталог изменён в другом процессе
+        Ingredient.objects.filter(pk=self.apricot.pk).update(name='айва')
+        with after_ttl():
+            response = self.client.get(
+                '/api/ingredients/', HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['name'], 'айва')
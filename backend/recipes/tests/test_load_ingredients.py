@@ -0,0 +1,70 @@
+import json
+import shutil
+import tempfile
+from io import StringIO
+from pathlib import Path
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from recipes.models import Ingredient
+
+ROWS = [
+    ('соль', 'г'),
+    ('перец', 'г'),
+    ('соль', 'щепотка'),
+    ('молоко', 'мл'),
+    ('соль', 'кг'),
+]
+
+
+class LoadIngredientsTest(TestCase):
+    """Загрузка CSV и JSON одинакова при COPY в PostgreSQL и при
+    upsert пачками: из повторов названия побеждает последняя строка.
+    """
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory, True)
+        self.directory = Path(directory)
+
+    def write(self, file_format, rows):
+        path = self.directory / f'ingredients.{file_format}'
+        if file_format == 'csv':
+            content = ''.join(f'{name},{unit}\n' for name, unit in rows)
+        else:
+            content = json.dumps(
+                [
+                    {'name': name, 'measurement_unit': unit}
+                    for name, unit in rows
+                ],
+                ensure_ascii=False
+            )
+        path.write_text(content, encoding='utf-8')
+        return path
+
+    def load(self, path, *args):
+        call_command('load_ingredients', str(path), *args, stdout=StringIO())
+        return dict(
+            Ingredient.objects.values_list('name', 'measurement_unit')
+        )
+
+    def test_last_duplicate_wins(self):
+        expected = {'соль': 'кг', 'перец': 'г', 'молоко': 'мл'}
+        for file_format in ('csv', 'json'):
+            for chunk_size in ('1', '2', '100'):
+                with self.subTest(format=file_format, chunk_size=chunk_size):
+                    Ingredient.objects.all().delete()
+                    path = self.write(file_format, ROWS)
+                    self.assertEqual(
+                        self.load(path, '--chunk-size', chunk_size), expected
+                    )
+
+    def test_reload_updates_units(self):
+        self.load(self.write('csv', ROWS))
+        ids = dict(Ingredient.objects.values_list('name', 'pk'))
+        self.assertEqual(
+            self.load(self.write('csv', [('соль', 'г'), ('сахар', 'г')])),
+            {'соль': 'г', 'перец': 'г', 'молоко': 'мл', 'сахар': 'г'}
+        )
+        self.assertEqual(Ingredient.objects.get(name='соль').pk, ids['соль'])
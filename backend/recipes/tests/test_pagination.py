@@ -0,0 +1,148 @@
+from unittest import mock
+
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from api.paginator import ESTIMATED_COUNT_MIN, CachedCountPaginator
+from recipes.models import Favorite, Recipe
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class RecipeKeysetPaginationTest(MediaMixin, APITestCase):
+    """Пагинация по ключу сохраняет порядок, выбранный в запросе."""
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        cls.ingredients = create_ingredients(3)
+        for number in range(7):
+            create_recipe(
+                author, cls.ingredients[:number % 3 + 1],
+                name=f'Рецепт {number}'
+            )
+        # Одинаковые значения проверяют сравнение по id
+        for number, recipe in enumerate(Recipe.objects.order_by('id')):
+            Recipe.objects.filter(pk=recipe.pk).update(
+                favorites_count=number % 3,
+                carts_count=number % 2,
+                trending_score=float(number % 4) / 3
+            )
+
+    def walk(self, params):
+        ids = []
+        response = self.client.get(
+            '/api/recipes/', {**params, 'limit': 2, 'cursor': ''}
+        )
+        while True:
+            self.assertEqual(response.status_code, 200)
+            ids += [recipe['id'] for recipe in response.data['results']]
+            if response.data['next'] is None:
+                return ids
+            response = self.client.get(response.data['next'])
+
+    def test_default_ordering(self):
+        self.assertEqual(
+            self.walk({}),
+            list(
+                Recipe.objects.order_by('-created_at', '-id')
+                .values_list('id', flat=True)
+            )
+        )
+
+    def test_requested_ordering(self):
+        for ordering, expected in (
+            (
+                'popular',
+                sorted(
+                    Recipe.objects.all(),
+                    key=lambda recipe: (
+                        recipe.favorites_count + recipe.carts_count,
+                        recipe.id
+                    ),
+                    reverse=True
+                )
+            ),
+            (
+                'trending',
+                Recipe.objects.order_by('-trending_score', '-id')
+            ),
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertEqual(
+                    self.walk({'ordering': ordering}),
+                    [recipe.id for recipe in expected]
+                )
+
+    def test_float_rank_ordering_rejected(self):
+        response = self.client.get(
+            '/api/recipes/',
+            {'pantry': self.ingredients[0].id, 'cursor': ''}
+        )
+        self.assertEqual(response.status_code, 400)
+
+    def test_page_numbers_keep_working(self):
+        response = self.client.get(
+            '/api/recipes/', {'pantry': self.ingredients[0].id}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 7)
+
+
+class RecipeCountTest(MediaMixin, APITestCase):
+    """Количество рецептов кешируется по параметрам запроса, а для
+    фильтров избранного и корзины — ещё и по версии пользователя.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        author = create_user('author')
+        ingredients = create_ingredients(1)
+        cls.recipes = [
+            create_recipe(author, ingredients, name=f'Рецепт {number}')
+            for number in range(3)
+        ]
+
+    def count(self, params=None):
+        response = self.client.get('/api/recipes/', params or {})
+        self.assertEqual(response.status_code, 200)
+        return response.data['count']
+
+    def test_favorited_count_follows_user_version(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.count({'is_favorited': 1}), 0)
+
+        # Без сброса версии пользователя количество берётся из кеша
+        Favorite.objects.create(user=self.user, recipe=self.recipes[0])
+        self.assertEqual(self.count({'is_favorited': 1}), 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                f'/api/recipes/{self.recipes[1].id}/favorite/'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.count({'is_favorited': 1}), 2)
+        self.assertEqual(self.count(), 3)
+
+    @override_settings(RECIPE_ESTIMATED_COUNT=True)
+    def test_small_table_count_is_exact(self):
+        response = self.client.get('/api/recipes/')
+        self.assertEqual(response.data['count'], 3)
+        self.assertTrue(response.data['count_is_exact'])
+
+    def test_estimate_threshold(self):
+        queryset = Recipe.objects.all()
+        for estimated, count, exact in (
+            (None, 3, True),
+            (ESTIMATED_COUNT_MIN - 1, 3, True),
+            (ESTIMATED_COUNT_MIN, ESTIMATED_COUNT_MIN, False),
+        ):
+            with self.subTest(estimated=estimated):
+                paginator = CachedCountPaginator(queryset, 2, estimate=True)
+                with mock.patch.object(
+                    CachedCountPaginator, 'estimated_count',
+                    return_value=estimated
+                ):
+                    self.assertEqual(paginator.count, count)
+                self.assertIs(paginator.count_is_exact, exact)
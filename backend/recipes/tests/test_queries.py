@@ -0,0 +1,108 @@
+from django.core.cache import cache
+from rest_framework.test import APITestCase
+
+from .utils import (MediaMixin, create_ingredients, create_recipe,
+                    create_user, image_data_uri)
+
+
+class RecipeListQueriesTest(MediaMixin, APITestCase):
+    """Количество запросов списка рецептов не зависит от размера
+    страницы.
+    """
+
+    LIST_QUERIES = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        authors = [create_user(f'author{number}') for number in range(3)]
+        ingredients = create_ingredients(5)
+        for number in range(12):
+            create_recipe(
+                authors[number % 3], ingredients[:number % 5 + 1],
+                name=f'Рецепт {number}'
+            )
+
+    def assert_list_queries(self):
+        for limit in (2, 10):
+            with self.subTest(limit=limit):
+                # Количество рецептов кешируется, считаем его заново
+                cache.clear()
+                with self.assertNumQueries(self.LIST_QUERIES):
+                    response = self.client.get(
+                        '/api/recipes/', {'limit': limit}
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['results']), limit)
+                self.assertTrue(all(
+                    recipe['ingredients']
+                    for recipe in response.data['results']
+                ))
+
+    def test_authenticated_list_queries(self):
+        self.client.force_authenticate(self.user)
+        self.assert_list_queries()
+
+    def test_anonymous_list_queries(self):
+        self.assert_list_queries()
+
+
+class RecipeWriteQueriesTest(MediaMixin, APITestCase):
+    """Количество запросов при создании и изменении рецепта
+    не зависит от числа ингредиентов.
+    """
+
+    CREATE_QUERIES = 13
+    UPDATE_QUERIES = 18
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(20)
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.author)
+
+    def recipe_data(self, ingredients, amount=10):
+        return {
+            'name': 'Рецепт',
+            'text': 'Описание',
+            'cooking_time': 30,
+            'image': image_data_uri(),
+            'ingredients': [
+                {'id': ingredient.id, 'amount': amount}
+                for ingredient in ingredients
+            ],
+        }
+
+    def test_create_queries(self):
+        for count in (2, 10):
+            with self.subTest(ingredients=count):
+                with self.assertNumQueries(self.CREATE_QUERIES):
+                    response = self.client.post(
+                        '/api/recipes/',
+                        self.recipe_data(self.ingredients[:count]),
+                        format='json'
+                    )
+                self.assertEqual(response.status_code, 201)
+                self.assertEqual(len(response.data['ingredients']), count)
+
+    def test_update_queries(self):
+        for count in (2, 10):
+            with self.subTest(ingredients=count):
+                recipe = create_recipe(
+                    self.author, self.ingredients[:count]
+                )
+                # Первый ингредиент убран, добавлен новый, количества
+                # остальных изменены. Поисковый вектор и ingredient_ids
+                # пересчитываются после коммита, в TestCase коммита нет,
+                # поэтому эти запросы сюда не входят.
+                ingredients = self.ingredients[1:count + 1]
+                data = self.recipe_data(ingredients, amount=20)
+                with self.assertNumQueries(self.UPDATE_QUERIES):
+                    response = self.client.patch(
+                        f'/api/recipes/{recipe.id}/', data, format='json'
+                    )
+                self.assertEqual(response.status_code, 200)
+                self.assertEqual(len(response.data['ingredients']), count)
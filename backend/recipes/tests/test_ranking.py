@@ -0,0 +1,57 @@
+import math
+from datetime import datetime, timezone
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import override_settings
+from rest_framework.test import APITestCase
+
+from recipes.models import Favorite, Recipe
+from recipes.ranking import TRENDING_MAX_HALF_LIVES, trending_weight
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+FAR_FUTURE = datetime(2100, 1, 1, tzinfo=timezone.utc)
+
+
+@override_settings(TRENDING_HALF_LIFE_DAYS=1)
+class TrendingOverflowTest(MediaMixin, APITestCase):
+    """Через годы после TRENDING_EPOCH вклад события остаётся
+    конечным числом, а добавление в избранное не падает.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.recipe = create_recipe(
+            create_user('author'), create_ingredients(1)
+        )
+
+    def test_weight_is_clamped(self):
+        weight = trending_weight(FAR_FUTURE)
+        self.assertTrue(math.isfinite(weight))
+        self.assertEqual(weight, 2.0 ** TRENDING_MAX_HALF_LIVES)
+        self.assertTrue(math.isfinite(weight * 2 ** 60))
+
+    def test_favorite_far_future(self):
+        self.client.force_authenticate(self.user)
+        with mock.patch('django.utils.timezone.now', return_value=FAR_FUTURE):
+            response = self.client.post(
+                f'/api/recipes/{self.recipe.id}/favorite/'
+            )
+        self.assertEqual(response.status_code, 201)
+        self.assertTrue(math.isfinite(
+            Recipe.objects.get(pk=self.recipe.pk).trending_score
+        ))
+
+    def test_recount_after_epoch_change(self):
+        Favorite.objects.create(user=self.user, recipe=self.recipe)
+        Favorite.objects.filter(recipe=self.recipe).update(
+            created_at=FAR_FUTURE
+        )
+        with override_settings(TRENDING_EPOCH=FAR_FUTURE):
+            call_command('recount', stdout=StringIO())
+            self.assertEqual(
+                Recipe.objects.get(pk=self.recipe.pk).trending_score, 1.0
+            )
@@ -0,0 +1,47 @@
+from rest_framework.test import APITestCase
+
+from recipes.models import Ingredient, Recipe
+from recipes.search import update_search_vectors
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class RecipeSearchTest(MediaMixin, APITestCase):
+    """Поиск рецептов: полнотекстовый в PostgreSQL и запасной
+    по подстрокам в других СУБД.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        author = create_user('author')
+        beet = Ingredient.objects.create(name='свекла', measurement_unit='г')
+        other = create_ingredients(2)
+        cls.in_name = create_recipe(
+            author, other, name='Салат свекла', text='Нарезать и смешать'
+        )
+        cls.in_text = create_recipe(
+            author, other, name='Суп', text='Сварить, добавить свекла'
+        )
+        cls.in_ingredients = create_recipe(
+            author, [beet, *other], name='Рагу', text='Потушить'
+        )
+        create_recipe(author, other, name='Омлет', text='Взбить яйца')
+        update_search_vectors(Recipe.objects.values('pk'))
+
+    def search(self, value):
+        response = self.client.get('/api/recipes/', {'search': value})
+        self.assertEqual(response.status_code, 200)
+        return [recipe['id'] for recipe in response.data['results']]
+
+    def test_ranked_by_match_place(self):
+        self.assertEqual(
+            self.search('свекла'),
+            [self.in_name.id, self.in_text.id, self.in_ingredients.id]
+        )
+
+    def test_all_terms_required(self):
+        # LIKE в SQLite не различает регистр только у латиницы
+        self.assertEqual(self.search('Салат свекла'), [self.in_name.id])
+
+    def test_nothing_found(self):
+        self.assertEqual(self.search('пицца'), [])
@@ -0,0 +1,146 @@
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from recipes.models import (Recipe, RecipeIngredient, ShoppingCart,
+                            ShoppingListItem)
+
+from .utils import (MediaMixin, create_ingredients, create_recipe,
+                    create_user, image_data_uri)
+
+
+class ShoppingListTotalsTest(MediaMixin, APITestCase):
+    """Суммы в списках покупок, поддерживаемые инкрементально,
+    совпадают с пересчётом rebuild_shopping_lists --check.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = create_user('reader')
+        cls.other = create_user('other')
+        cls.author = create_user('author')
+        cls.ingredients = create_ingredients(4)
+        cls.recipe = create_recipe(cls.author, cls.ingredients[:3])
+        cls.second = create_recipe(
+            cls.author, cls.ingredients[1:], amount=5, name='Второй'
+        )
+        get_user_model().objects.filter(pk=cls.author.pk).update(
+            recipes_count=2
+        )
+
+    def assert_consistent(self):
+        # При расхождении команда завершается с CommandError
+        call_command(
+            'rebuild_shopping_lists', '--check',
+            stdout=StringIO(), stderr=StringIO()
+        )
+
+    def totals(self, user):
+        return dict(
+            ShoppingListItem.objects.filter(
+                user=user
+            ).values_list('ingredient', 'total')
+        )
+
+    def add_to_carts(self):
+        for user in (self.user, self.other):
+            self.client.force_authenticate(user)
+            for recipe in (self.recipe, self.second):
+                response = self.client.post(
+                    f'/api/recipes/{recipe.id}/shopping_cart/'
+                )
+                self.assertEqual(response.status_code, 201)
+        self.assert_consistent()
+
+    def test_api(self):
+        self.add_to_carts()
+
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(
+            f'/api/recipes/{self.recipe.id}/',
+            {
+                'name': 'Рецепт',
+                'text': 'Описание',
+                'cooking_time': 30,
+                'image': image_data_uri(),
+                'ingredients': [
+                    {'id': self.ingredients[0].id, 'amount': 15},
+                    {'id': self.ingredients[3].id, 'amount': 7},
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assert_consistent()
+
+        self.client.force_authenticate(self.user)
+        response = self.client.delete(
+            f'/api/recipes/{self.second.id}/shopping_cart/'
+        )
+        self.assertEqual(response.status_code, 204)
+        self.assert_consistent()
+
+        self.client.force_authenticate(self.author)
+        response = self.client.delete(f'/api/recipes/{self.recipe.id}/')
+        self.assertEqual(response.status_code, 204)
+        self.assert_consistent()
+        self.assertEqual(self.totals(self.user), {})
+
+    def test_cart_rows(self):
+        cart = ShoppingCart.objects.create(user=self.user, recipe=self.recipe)
+        ShoppingCart.objects.create(user=self.user, recipe=self.second)
+        self.assert_consistent()
+
+        cart.recipe = self.second
+        cart.user = self.other
+        cart.save()
+        self.assert_consistent()
+
+        cart.delete()
+        self.assert_consistent()
+
+        ShoppingCart.objects.filter(user=self.user).delete()
+        self.assert_consistent()
+        self.assertEqual(self.totals(self.user), {})
+
+    def test_recipe_ingredient_rows(self):
+        self.add_to_carts()
+        recipe_ingredient = RecipeIngredient.objects.get(
+            recipe=self.recipe, ingredient=self.ingredients[0]
+        )
+        recipe_ingredient.amount = 25
+        recipe_ingredient.save()
+        self.assert_consistent()
+
+        recipe_ingredient.ingredient = self.ingredients[3]
+        recipe_ingredient.save()
+        self.assert_consistent()
+
+        RecipeIngredient.objects.create(
+            recipe=self.second, ingredient=self.ingredients[0], amount=3
+        )
+        self.assert_consistent()
+
+        recipe_ingredient.delete()
+        self.assert_consistent()
+
+    def test_recipe_delete(self):
+        self.add_to_carts()
+        self.recipe.delete()
+        self.assert_consistent()
+
+        Recipe.objects.all().delete()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.exists())
+
+    def test_user_delete(self):
+        self.add_to_carts()
+        self.user.delete()
+        self.assert_consistent()
+        self.assertTrue(self.totals(self.other))
+
+        self.author.delete()
+        self.assert_consistent()
+        self.assertFalse(ShoppingListItem.objects.exists())
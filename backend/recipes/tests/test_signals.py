@@ -0,0 +1,46 @@
+from unittest import mock
+
+from django.db import transaction
+from django.test import TransactionTestCase
+
+from recipes.models import RecipeIngredient
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class RecipesChangedTest(MediaMixin, TransactionTestCase):
+    """Пересчёт рецептов выполняется один раз на транзакцию,
+    сколько бы строк ингредиентов в ней ни изменилось.
+    """
+
+    def test_one_recalculation_per_transaction(self):
+        author = create_user('author')
+        ingredients = create_ingredients(10)
+        first = create_recipe(author, ingredients)
+        second = create_recipe(author, ingredients)
+
+        with mock.patch('recipes.signals.recipes_changed') as changed:
+            with transaction.atomic():
+                RecipeIngredient.objects.filter(
+                    recipe=first, ingredient__in=ingredients[:5]
+                ).delete()
+                RecipeIngredient.objects.filter(recipe=second).delete()
+                first.save()
+            changed.assert_called_once_with(sorted([first.pk, second.pk]))
+
+    def test_rollback_discards_pending_recipes(self):
+        author = create_user('author')
+        ingredients = create_ingredients(2)
+        first = create_recipe(author, ingredients)
+        second = create_recipe(author, ingredients)
+
+        with mock.patch('recipes.signals.recipes_changed') as changed:
+            with self.assertRaises(RuntimeError):
+                with transaction.atomic():
+                    RecipeIngredient.objects.filter(recipe=first).delete()
+                    raise RuntimeError
+            changed.assert_not_called()
+
+            with transaction.atomic():
+                RecipeIngredient.objects.filter(recipe=second).delete()
+            changed.assert_called_once_with([second.pk])
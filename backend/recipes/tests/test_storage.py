@@ -0,0 +1,44 @@
+import threading
+import time
+
+from django.db import connection, transaction
+from django.test import TransactionTestCase
+
+from recipes.images import release_image
+from recipes.models import Recipe
+from recipes.storage import image_storage
+
+from .utils import MediaMixin, create_ingredients, create_recipe, create_user
+
+
+class ImageStorageLockTest(MediaMixin, TransactionTestCase):
+    """Удаление изображения ждёт транзакцию, которая сохранила
+    ссылку на тот же файл.
+    """
+
+    def test_release_waits_for_saving_transaction(self):
+        author = create_user('author')
+        ingredients = create_ingredients(1)
+        name = create_recipe(author, ingredients).image.name
+        Recipe.objects.update(image='')
+        saved = threading.Event()
+
+        def reuse_image():
+            try:
+                with transaction.atomic():
+                    create_recipe(author, ingredients)
+                    saved.set()
+                    # Удаление должно дождаться коммита
+                    time.sleep(0.3)
+            finally:
+                saved.set()
+                connection.close()
+
+        thread = threading.Thread(target=reuse_image)
+        thread.start()
+        saved.wait()
+        release_image(image_storage, name, None)
+        thread.join()
+
+        self.assertTrue(Recipe.objects.filter(image=name).exists())
+        self.assertTrue(image_storage.exists(name))
@@ -0,0 +1,79 @@
+import base64
+import shutil
+import tempfile
+from io import BytesIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import override_settings
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, RecipeIngredient
+
+
+def image_file(name='recipe.png', color=(200, 120, 40), size=(8, 8)):
+    buffer = BytesIO()
+    Image.new('RGB', size, color).save(buffer, 'PNG')
+    return SimpleUploadedFile(name, buffer.getvalue(), 'image/png')
+
+
+def image_data_uri(color=(200, 120, 40), size=(8, 8)):
+    image = image_file(color=color, size=size)
+    return 'data:image/png;base64,' + base64.b64encode(image.read()).decode()
+
+
+def create_user(username, **kwargs):
+    return get_user_model().objects.create_user(
+        username=username,
+        email=f'{username}@example.com',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='password',
+        **kwargs
+    )
+
+
+def create_ingredients(count, prefix='ингредиент'):
+    return Ingredient.objects.bulk_create([
+        Ingredient(name=f'{prefix} {number:03}', measurement_unit='г')
+        for number in range(count)
+    ])
+
+
+def create_recipe(author, ingredients, amount=10, **kwargs):
+    recipe = Recipe.objects.create(
+        author=author,
+        name=kwargs.pop('name', 'Рецепт'),
+        text=kwargs.pop('text', 'Описание'),
+        image=kwargs.pop('image', None) or image_file(),
+        cooking_time=kwargs.pop('cooking_time', 30),
+        **kwargs
+    )
+    RecipeIngredient.objects.bulk_create([
+        RecipeIngredient(recipe=recipe, ingredient=ingredient, amount=amount)
+        for ingredient in ingredients
+    ])
+    return recipe
+
+
+class MediaMixin:
+    """Изображения пишутся во временный каталог, миниатюры строятся
+    сразу, кеш очищается перед каждым тестом.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, media_root, True)
+        media_settings = override_settings(
+            MEDIA_ROOT=media_root,
+            IMAGE_TASK_BACKEND='recipes.images.ImmediateBackend'
+        )
+        media_settings.enable()
+        cls.addClassCleanup(media_settings.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        cache.clear()
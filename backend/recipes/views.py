@@ -1,19 +1,46 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import re
+from functools import partial
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Prefetch, Value
+from django.http import (Http404, HttpResponse, HttpResponseNotModified,
+                         StreamingHttpResponse)
 from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.cache import patch_cache_control, patch_vary_headers
+from django.utils.http import parse_etags
+from django.utils.text import compress_sequence
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from api.paginator import RecipePaginator
+from api.paginator import FeedPaginator, RecipePaginator
 from api.permissions import IsAuthorOrReadOnly
+from users.models import Subscription
 from users.serializers import UserRecipeSerializer
 
+from . import shortlinks
+from .cache import AnonymousResponseCacheMixin, invalidate_user_recipes
 from .filters import IngredientSearchFilter, RecipeFilter
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart)
-from .serializers import IngredientSerializer, RecipeSerializer
+from .ingredient_index import ingredient_index
+from .models import (Favorite, FeedEntry, Ingredient, Recipe,
+                     RecipeIngredient, ShoppingCart, ShoppingListItem)
+from .ranking import trending_change
+from .renderers import (ShoppingCartCSVRenderer, ShoppingCartJSONRenderer,
+                        ShoppingCartTextRenderer)
+from .returning import delete_link, insert_links
+from .serializers import (BatchSerializer, IngredientSerializer,
+                          RecipeSerializer, batch_results)
+
+EXPORT_CHUNK_SIZE = 2000
+GZIP_RE = re.compile(r'\bgzip\b')
+RECIPE_COUNTERS = {
+    Favorite: 'favorites_count',
+    ShoppingCart: 'carts_count'
+}
 
 
 class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
@@ -24,8 +51,40 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name', )
     pagination_class = None
 
+    def list(self, request, *args, **kwargs):
+        # Отвечаем из индекса в памяти, не обращаясь к базе данных
+        terms = IngredientSearchFilter().get_search_terms(request)
+        if terms:
+            return Response(ingredient_index.search(terms))
+        return self.catalog_response(request)
+
+    def catalog_response(self, request):
+        catalog = ingredient_index.catalog()
+        gzipped = GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        body, etag = (
+            (catalog.gzip_body, catalog.gzip_etag) if gzipped
+            else (catalog.body, catalog.etag)
+        )
+
+        if_none_match = parse_etags(request.META.get('HTTP_IF_NONE_MATCH', ''))
+        if (
+            '*' in if_none_match
+            or catalog.etag in if_none_match
+            or catalog.gzip_etag in if_none_match
+        ):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(body, content_type='application/json')
+            if gzipped:
+                response['Content-Encoding'] = 'gzip'
+
+        response['ETag'] = etag
+        patch_cache_control(response, no_cache=True)
+        patch_vary_headers(response, ('Accept-Encoding', ))
+        return response
+
 
-class RecipeViewSet(viewsets.ModelViewSet):
+class RecipeViewSet(AnonymousResponseCacheMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     serializer_class = RecipeSerializer
     permission_classes = (IsAuthorOrReadOnly, )
@@ -33,35 +92,159 @@ class RecipeViewSet(viewsets.ModelViewSet):
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
 
+    def get_queryset(self):
+        queryset = Recipe.objects.select_related('author').defer(
+            'search_vector', 'ingredient_ids'
+        ).prefetch_related(
+            Prefetch(
+                'ingredient_amount',
+                queryset=RecipeIngredient.objects.select_related('ingredient')
+            )
+        )
+        user = self.request.user
+
+        if user.is_anonymous:
+            return queryset.annotate(
+                is_favorited=Value(False),
+                is_in_shopping_cart=Value(False),
+                author_is_subscribed=Value(False)
+            )
+
+        return queryset.annotate(
+            is_favorited=Exists(
+                Favorite.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            is_in_shopping_cart=Exists(
+                ShoppingCart.objects.filter(user=user, recipe=OuterRef('pk'))
+            ),
+            author_is_subscribed=Exists(
+                Subscription.objects.filter(
+                    user=OuterRef('author'),
+                    follower=user
+                )
+            )
+        )
+
     def perform_create(self, serializer):
-        serializer.save(author=self.request.user)
+        with transaction.atomic():
+            recipe = serializer.save(author=self.request.user)
+            FeedEntry.objects.fan_out(recipe)
+            get_user_model().objects.filter(pk=self.request.user.pk).update(
+                recipes_count=F('recipes_count') + 1
+            )
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            serializer.save()
+
+    def perform_destroy(self, instance):
+        with transaction.atomic():
+            instance.delete()
+            get_user_model().objects.filter(pk=instance.author_id).update(
+                recipes_count=F('recipes_count') - 1
+            )
 
     def recipes_management(self, model, request, pk):
         recipe = get_object_or_404(Recipe, pk=pk)
         user = request.user
+        counter = RECIPE_COUNTERS[model]
 
         if request.method == 'POST':
-            if model.objects.filter(recipe=recipe, user=user).exists():
-                return Response(status=status.HTTP_400_BAD_REQUEST)
-            favorite = model.objects.create(
-                recipe=recipe,
-                user=request.user
-            )
+            with transaction.atomic():
+                created_at = timezone.now()
+                # Повторное добавление не прерывает транзакцию
+                # и не возвращает строку
+                if not insert_links(
+                    model, 'user', user.id, 'recipe', [recipe.pk],
+                    values={'created_at': created_at}
+                ):
+                    return Response(status=status.HTTP_400_BAD_REQUEST)
+                transaction.on_commit(
+                    partial(invalidate_user_recipes, user.id)
+                )
+                Recipe.objects.filter(pk=recipe.pk).update(
+                    **{counter: F(counter) + 1},
+                    trending_score=trending_change(created_at)
+                )
+                if model is ShoppingCart:
+                    ShoppingListItem.objects.add_recipe([user.id], recipe)
             serializer = UserRecipeSerializer(
                 recipe,
                 context={'request': request}
             )
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        favorite = model.objects.filter(
-            recipe=recipe,
-            user=request.user
-        )
+        with transaction.atomic():
+            # Из одновременных запросов на удаление строку вернёт
+            # и изменит счётчики только первый
+            created_at = delete_link(
+                model, 'user', user.id, 'recipe', recipe.pk, 'created_at'
+            )
+            if created_at is None:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            transaction.on_commit(
+                partial(invalidate_user_recipes, user.id)
+            )
+            Recipe.objects.filter(pk=recipe.pk).update(
+                **{counter: F(counter) - 1},
+                trending_score=trending_change(created_at, sign=-1)
+            )
+            if model is ShoppingCart:
+                ShoppingListItem.objects.remove_recipe([user.id], recipe)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    def recipes_batch(self, model, request):
+        """Добавляет несколько рецептов в избранное или корзину.
+
+        Добавление — один INSERT … ON CONFLICT DO NOTHING RETURNING,
+        счётчики и список покупок меняются только для вернувшихся
+        рецептов. Для каждого id возвращается статус created, exists
+        или not_found.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        user = request.user
+        counter = RECIPE_COUNTERS[model]
+
+        with transaction.atomic():
+            created_at = timezone.now()
+            created = insert_links(
+                model, 'user', user.id, 'recipe', ids,
+                values={'created_at': created_at}
+            )
+            if created:
+                transaction.on_commit(
+                    partial(invalidate_user_recipes, user.id)
+                )
+                Recipe.objects.filter(pk__in=created).update(
+                    **{counter: F(counter) + 1},
+                    trending_score=trending_change(created_at)
+                )
+                if model is ShoppingCart:
+                    ShoppingListItem.objects.add_recipes([user.id], created)
+
+        statuses = dict.fromkeys(created, 'created')
+        if len(created) < len(ids):
+            statuses.update(dict.fromkeys(
+                Recipe.objects.filter(
+                    pk__in=set(ids) - statuses.keys()
+                ).values_list('pk', flat=True),
+                'exists'
+            ))
+        return Response(batch_results(ids, statuses))
 
-        if favorite:
-            favorite.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+    @action(
+        methods=['get'],
+        detail=False,
+        permission_classes=(permissions.IsAuthenticated, ),
+        pagination_class=FeedPaginator
+    )
+    def feed(self, request):
+        """Рецепты авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
     @action(
         methods=['get'],
@@ -70,7 +253,13 @@ class RecipeViewSet(viewsets.ModelViewSet):
         permission_classes=(permissions.IsAuthenticatedOrReadOnly, )
     )
     def get_link(self, request, pk):
-        short_link = request.build_absolute_uri()[:-9]
+        try:
+            shortlinks.recipe_path(int(pk))
+        except (ValueError, Recipe.DoesNotExist):
+            raise Http404
+        short_link = request.build_absolute_uri(
+            reverse('short-link', args=[shortlinks.encode(int(pk))])
+        )
 
         return Response({'short-link': short_link}, status=status.HTTP_200_OK)
 
@@ -90,36 +279,62 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def shopping_cart(self, request, pk):
         return self.recipes_management(ShoppingCart, request, pk)
 
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='favorite',
+        url_name='favorite-batch',
+        permission_classes=(permissions.IsAuthenticated, )
+    )
+    def favorite_batch(self, request):
+        return self.recipes_batch(Favorite, request)
+
+    @action(
+        methods=['post'],
+        detail=False,
+        url_path='shopping_cart',
+        url_name='shopping-cart-batch',
+        permission_classes=(permissions.IsAuthenticated, )
+    )
+    def shopping_cart_batch(self, request):
+        return self.recipes_batch(ShoppingCart, request)
+
     @action(
         methods=['get'],
         detail=False,
-        url_path='download_shopping_cart'
+        url_path='download_shopping_cart',
+        permission_classes=(permissions.IsAuthenticated, ),
+        renderer_classes=(
+            ShoppingCartTextRenderer,
+            ShoppingCartCSVRenderer,
+            ShoppingCartJSONRenderer
+        )
     )
     def download_shopping_cart(self, request):
-        recipes_in_cart = Recipe.objects.filter(
-            recipes_in_shopping_cart__user=request.user
-        )
-
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__in=recipes_in_cart
+        ingredients = ShoppingListItem.objects.filter(
+            user=request.user
         ).values(
-            'ingredient__name', 'ingredient__measurement_unit'
-        ).annotate(
-            total=Sum('amount')
+            'ingredient__name', 'ingredient__measurement_unit', 'total'
         ).order_by('ingredient__name')
 
-        result_list = []
-
-        for ingredient in ingredients:
-            name = ingredient['ingredient__name']
-            amount = ingredient['total']
-            measurement_unit = ingredient['ingredient__measurement_unit']
-            result_list.append(f'{name} - {amount} {measurement_unit}')
+        renderer = request.accepted_renderer
+        content = renderer.stream(
+            ingredients.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+        )
+        content = (chunk.encode(renderer.charset) for chunk in content)
 
-        result_string = ',\n'.join(result_list)
+        gzipped = GZIP_RE.search(request.META.get('HTTP_ACCEPT_ENCODING', ''))
+        if gzipped:
+            content = compress_sequence(content)
 
-        response = HttpResponse(result_string, content_type='text/plain')
+        response = StreamingHttpResponse(
+            content,
+            content_type=f'{renderer.media_type}; charset={renderer.charset}'
+        )
+        patch_vary_headers(response, ('Accept', 'Accept-Encoding'))
+        if gzipped:
+            response['Content-Encoding'] = 'gzip'
 
-        filename = 'shopping_cart.txt'
+        filename = f'shopping_cart.{renderer.format}'
         response['Content-Disposition'] = f'attachment; filename={filename}'
         return response
@@ -8,8 +8,15 @@ from .models import Subscription
 @admin.register(get_user_model())
 class FoogramUserAdmin(UserAdmin):
     fieldsets = UserAdmin.fieldsets + (
-        ('Дополнительно', {'fields': ('avatar',)}),
+        (
+            'Дополнительно',
+            {'fields': ('avatar', 'recipes_count', 'followers_count')}
+        ),
     )
+    list_display = UserAdmin.list_display + (
+        'recipes_count', 'followers_count'
+    )
+    readonly_fields = ('recipes_count', 'followers_count')
     search_fields = ('username', 'email')
     list_filter = ('is_staff', )
 
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:01
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0008_foodgramuser_counters'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='subscription',
+            index=models.Index(fields=['follower', 'user'], name='subscription_follower_user_idx'),
+        ),
+    ]
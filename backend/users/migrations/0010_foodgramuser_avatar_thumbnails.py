@@ -0,0 +1,18 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0009_subscription_follower_user_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='foodgramuser',
+            name='avatar_thumbnails',
+            field=models.JSONField(editable=False, null=True, verbose_name='Миниатюры аватара'),
+        ),
+    ]
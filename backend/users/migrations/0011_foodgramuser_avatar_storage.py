@@ -0,0 +1,24 @@
+# Generated by Django 5.2.3 on 2026-10-18 18:17
+
+import recipes.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0010_foodgramuser_avatar_thumbnails'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='foodgramuser',
+            name='avatar',
+            field=models.ImageField(default=None, null=True, storage=recipes.storage.ContentAddressedStorage(), upload_to='users/avatars/', verbose_name='Аватар пользователя'),
+        ),
+        migrations.AddIndex(
+            model_name='foodgramuser',
+            index=models.Index(fields=['avatar'], name='user_avatar_idx'),
+        ),
+    ]
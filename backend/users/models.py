@@ -3,6 +3,8 @@ from django.contrib.auth.models import AbstractUser
 from django.core.validators import RegexValidator
 from django.db import models
 
+from recipes.storage import image_storage
+
 
 class FoodgramUser(AbstractUser):
     username = models.CharField(
@@ -34,19 +36,53 @@ class FoodgramUser(AbstractUser):
     avatar = models.ImageField(
         verbose_name='Аватар пользователя',
         upload_to='users/avatars/',
+        storage=image_storage,
         default=None,
         null=True
     )
 
+    recipes_count = models.PositiveIntegerField(
+        verbose_name='Рецептов',
+        default=0,
+        editable=False
+    )
+    followers_count = models.PositiveIntegerField(
+        verbose_name='Подписчиков',
+        default=0,
+        editable=False
+    )
+    avatar_thumbnails = models.JSONField(
+        verbose_name='Миниатюры аватара',
+        null=True,
+        editable=False
+    )
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
+    DENORMALIZED_FIELDS = (
+        'recipes_count', 'followers_count', 'avatar_thumbnails'
+    )
 
     def __str__(self):
         return self.username
 
+    def save(self, *args, **kwargs):
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            # Счётчики и миниатюры обновляются запросами UPDATE,
+            # полное сохранение не должно перезаписывать их.
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.DENORMALIZED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     class Meta:
         verbose_name = 'Пользователь'
         verbose_name_plural = 'Пользователи'
+        indexes = [
+            models.Index(fields=['avatar'], name='user_avatar_idx')
+        ]
 
 
 class Subscription(models.Model):
@@ -67,6 +103,12 @@ class Subscription(models.Model):
         verbose_name = 'Подписка'
         verbose_name_plural = 'Подписки'
         ordering = ('user', )
+        indexes = [
+            models.Index(
+                fields=['follower', 'user'],
+                name='subscription_follower_user_idx'
+            )
+        ]
         constraints = [
             models.UniqueConstraint(
                 fields=['user', 'follower'],
@@ -1,38 +1,39 @@
-import base64
-
 from django.contrib.auth import get_user_model
-from django.core.files.base import ContentFile
 from djoser.serializers import UserSerializer
 from rest_framework import serializers
 
+from api.fields import Base64ImageField, ThumbnailsField
 from recipes.models import Recipe
 from .models import FoodgramUser
 
 
-class Base64AvatarField(serializers.ImageField):
-    def to_internal_value(self, data):
-        if isinstance(data, str) and data.startswith('data:image'):
-            format, imgstr = data.split(';base64,')
-            ext = format.split('/')[-1]
-            data = ContentFile(base64.b64decode(imgstr), name='avatar.' + ext)
-
-        return super().to_internal_value(data)
+def get_recipes_limit(request):
+    limit = request.query_params.get('recipes_limit')
+    try:
+        return int(limit)
+    except (TypeError, ValueError):
+        return None
 
 
 class FoodgramUserSerializer(UserSerializer):
     first_name = serializers.CharField(required=True)
     last_name = serializers.CharField(required=True)
     is_subscribed = serializers.SerializerMethodField()
-    avatar = Base64AvatarField(required=False, allow_null=True)
+    avatar = Base64ImageField(
+        file_name='avatar', required=False, allow_null=True
+    )
+    avatar_thumbnails = ThumbnailsField('avatar')
 
     class Meta(UserSerializer.Meta):
         model = FoodgramUser
         fields = (
             'email', 'id', 'username', 'is_subscribed',
-            'first_name', 'last_name', 'avatar'
+            'first_name', 'last_name', 'avatar', 'avatar_thumbnails'
         )
 
     def get_is_subscribed(self, obj):
+        if hasattr(obj, 'is_subscribed'):
+            return obj.is_subscribed
         user = self.context['request'].user
         if user.is_anonymous:
             return False
@@ -49,35 +50,35 @@ class FoodgramUserSerializer(UserSerializer):
 
 
 class UserRecipeSerializer(serializers.ModelSerializer):
+    image_thumbnails = ThumbnailsField('image')
+
     class Meta:
         model = Recipe
-        fields = ('id', 'name', 'image', 'cooking_time')
+        fields = ('id', 'name', 'image', 'image_thumbnails', 'cooking_time')
 
 
 class SubscriptionSerializer(serializers.ModelSerializer):
     is_subscribed = serializers.SerializerMethodField()
-    recipes_count = serializers.SerializerMethodField()
     recipes = serializers.SerializerMethodField()
+    avatar_thumbnails = ThumbnailsField('avatar')
 
     class Meta:
         model = get_user_model()
         fields = (
             'email', 'id', 'username', 'is_subscribed', 'recipes',
-            'first_name', 'last_name', 'avatar', 'recipes_count'
+            'first_name', 'last_name', 'avatar', 'avatar_thumbnails',
+            'recipes_count'
         )
+        read_only_fields = ('recipes_count', )
 
     def get_recipes(self, obj):
-        recipes = obj.recipes.all()
-
-        request = self.context.get('request')
-        limit = request.query_params.get('recipes_limit')
-        try:
-            limit = int(limit)
-        except (TypeError, ValueError):
-            limit = None
+        recipes = getattr(obj, 'limited_recipes', None)
 
-        if limit:
-            recipes = recipes[:limit]
+        if recipes is None:
+            recipes = obj.recipes.all()
+            limit = get_recipes_limit(self.context.get('request'))
+            if limit:
+                recipes = recipes[:limit]
 
         return UserRecipeSerializer(
             recipes, many=True, context=self.context
@@ -85,6 +86,3 @@ class SubscriptionSerializer(serializers.ModelSerializer):
 
     def get_is_subscribed(self, obj):
         return True
-
-    def get_recipes_count(self, obj):
-        return obj.recipes.count()
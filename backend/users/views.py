@@ -1,4 +1,6 @@
 from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import F, Prefetch
 from django.shortcuts import get_object_or_404
 from djoser.views import UserViewSet
 from rest_framework import permissions, status
@@ -6,9 +8,13 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from api.paginator import FoodgramUserPaginator
+from recipes.models import FeedEntry, Recipe
+from recipes.returning import delete_link, insert_links
+from recipes.serializers import BatchSerializer, batch_results
 
 from .models import Subscription
-from .serializers import FoodgramUserSerializer, SubscriptionSerializer
+from .serializers import (FoodgramUserSerializer, SubscriptionSerializer,
+                          get_recipes_limit)
 
 
 class FoodgramUserViewSet(UserViewSet):
@@ -41,25 +47,23 @@ class FoodgramUserViewSet(UserViewSet):
             id=id
         )
         if request.method == 'POST':
-            if (
-                follower == following_user
-                or following_user.subscriptions.filter(
-                    follower=follower
-                ).exists()
-                # Subscription.objects.filter(
-                #     user=following_user,
-                #     follower=follower
-                # ).exists()
-            ):
+            if follower == following_user:
                 return Response(status=status.HTTP_400_BAD_REQUEST)
-
-            subscription = Subscription.objects.create(
-                user=following_user,
-                follower=follower
-            )
+            with transaction.atomic():
+                # Повторная подписка не прерывает транзакцию
+                # и не возвращает строку
+                if not insert_links(
+                    Subscription, 'follower', follower.id,
+                    'user', [following_user.pk]
+                ):
+                    return Response(status=status.HTTP_400_BAD_REQUEST)
+                get_user_model().objects.filter(
+                    pk=following_user.pk
+                ).update(followers_count=F('followers_count') + 1)
+                FeedEntry.objects.follow(follower, [following_user])
 
             serializer = SubscriptionSerializer(
-                subscription.user,
+                following_user,
                 context={'request': request}
             )
 
@@ -68,28 +72,42 @@ class FoodgramUserViewSet(UserViewSet):
                 status=status.HTTP_201_CREATED
             )
 
-        subscription = following_user.subscriptions.filter(follower=follower)
-        # subscription = Subscription.objects.filter(
-        #     user=following_user,
-        #     follower=follower
-        # )
-
-        if subscription:
-            subscription.delete()
-            return Response(status=status.HTTP_204_NO_CONTENT)
-
-        return Response(status=status.HTTP_400_BAD_REQUEST)
+        with transaction.atomic():
+            # Счётчик меняет только запрос, который действительно
+            # удалил подписку
+            if delete_link(
+                Subscription, 'follower', follower.id,
+                'user', following_user.pk, 'user'
+            ) is None:
+                return Response(status=status.HTTP_400_BAD_REQUEST)
+            get_user_model().objects.filter(pk=following_user.pk).update(
+                followers_count=F('followers_count') - 1
+            )
+            FeedEntry.objects.unfollow(follower, following_user)
+        return Response(status=status.HTTP_204_NO_CONTENT)
 
     @action(
-        methods=['get', ],
+        methods=['get', 'post'],
         url_path='subscriptions',
         detail=False,
     )
     def subscriptions(self, request):
+        if request.method == 'POST':
+            return self.subscribe_batch(request)
+
         paginator = self.pagination_class()
 
+        recipes = Recipe.objects.all()
+        limit = get_recipes_limit(request)
+        if limit:
+            # Срез в Prefetch выполняется одним запросом
+            # через ROW_NUMBER() OVER (PARTITION BY author_id)
+            recipes = recipes[:limit]
+
         subscriptions = get_user_model().objects.filter(
             subscriptions__follower=request.user.id
+        ).prefetch_related(
+            Prefetch('recipes', queryset=recipes, to_attr='limited_recipes')
         )
 
         page = paginator.paginate_queryset(
@@ -104,6 +122,44 @@ class FoodgramUserViewSet(UserViewSet):
 
         return paginator.get_paginated_response(serializer.data)
 
+    def subscribe_batch(self, request):
+        """Подписывает пользователя на нескольких авторов сразу,
+        для каждого id возвращает статус created, exists, invalid
+        или not_found.
+
+        Подписки добавляются одним INSERT … ON CONFLICT DO NOTHING
+        RETURNING, счётчики и ленты меняются только для вернувшихся
+        авторов.
+        """
+        serializer = BatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        follower = request.user
+
+        with transaction.atomic():
+            created = insert_links(
+                Subscription, 'follower', follower.id, 'user', ids,
+                exclude_owner=True
+            )
+            if created:
+                authors = get_user_model().objects.filter(pk__in=created)
+                authors.update(followers_count=F('followers_count') + 1)
+                FeedEntry.objects.follow(
+                    follower, authors.only('pk', 'followers_count')
+                )
+
+        statuses = dict.fromkeys(created, 'created')
+        if len(created) < len(ids):
+            statuses.update(dict.fromkeys(
+                get_user_model().objects.filter(
+                    pk__in=set(ids) - statuses.keys()
+                ).values_list('pk', flat=True),
+                'exists'
+            ))
+        if follower.id in statuses:
+            statuses[follower.id] = 'invalid'
+        return Response(batch_results(ids, statuses))
+
     @action(
         methods=['put', 'delete'],
         detail=False,
@@ -125,7 +181,9 @@ class FoodgramUserViewSet(UserViewSet):
             )
 
             serializer.is_valid(raise_exception=True)
-            serializer.save()
+            # Файл сохраняется под блокировкой до коммита записи
+            with transaction.atomic():
+                serializer.save()
 
             return Response(
                 data={'avatar': user.avatar.url},